@@ -1,12 +1,17 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
+from functools import lru_cache
 import asyncio
 import logging
 
 from query_generator import SQLQueryGenerator, QueryExecutionMode, QueryResult
 from database import db_manager
+from gemini_client import gemini_client
+from mcp_client import mcp_manager
 from config import settings
 
 # Set up logging
@@ -16,7 +21,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="SQL Query Generator API",
     description="Generate SQL queries from natural language using Gemini AI",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -45,13 +51,39 @@ class QueryResponse(BaseModel):
     row_count: Optional[int] = None
     confidence: float = 0.0
 
-# Global query generators
-generators = {
-    "direct": SQLQueryGenerator(QueryExecutionMode.DIRECT),
-    "mcp": SQLQueryGenerator(QueryExecutionMode.MCP),
-    "dry-run": SQLQueryGenerator(QueryExecutionMode.DRY_RUN)
+# Execution-mode names accepted by the API (note "dry-run" vs the enum's "dry_run")
+_EXECUTION_MODES = {
+    "direct": QueryExecutionMode.DIRECT,
+    "mcp": QueryExecutionMode.MCP,
+    "dry-run": QueryExecutionMode.DRY_RUN
 }
 
+@lru_cache(maxsize=len(_EXECUTION_MODES))
+def get_generator(mode: str) -> SQLQueryGenerator:
+    """Build the generator for a mode on first use and reuse it afterwards."""
+    return SQLQueryGenerator(_EXECUTION_MODES[mode])
+
+# Bound concurrent generation so burst traffic can't exhaust the Gemini
+# quota, and coalesce identical in-flight requests into a single call.
+_generate_semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
+_inflight: Dict[tuple, asyncio.Future] = {}
+
+@app.on_event("startup")
+async def startup():
+    """Warm up the connection pool and Gemini client so first requests don't pay for them."""
+    # MCP handshake warms in the background; mcp-mode requests are the
+    # minority and shouldn't delay serving direct ones.
+    asyncio.create_task(mcp_manager.warmup())
+    await asyncio.to_thread(db_manager.test_connection)
+    if settings.gemini_api_key:
+        gemini_client._ensure_initialized()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release pooled database connections and the shared MCP session."""
+    await mcp_manager.shutdown()
+    await asyncio.to_thread(db_manager.close_pool)
+
 @app.get("/")
 async def root():
     """Root endpoint with API information."""
@@ -70,59 +102,168 @@ async def generate_query(request: QueryRequest):
     """Generate and optionally execute SQL query."""
     try:
         # Validate execution mode
-        if request.execution_mode not in generators:
+        if request.execution_mode not in _EXECUTION_MODES:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid execution mode. Choose from: {list(generators.keys())}"
+                detail=f"Invalid execution mode. Choose from: {list(_EXECUTION_MODES.keys())}"
             )
-        
+
         # Get appropriate generator
-        generator = generators[request.execution_mode]
-        
-        # Generate query
-        result = await generator.generate_and_execute_query(
-            request.query,
-            request.query_type,
-            request.execute
-        )
+        generator = get_generator(request.execution_mode)
+
+        # Generate query, piggybacking on an identical in-flight request
+        # instead of calling Gemini twice for the same prompt.
+        key = (request.query, request.query_type, request.execution_mode, request.execute)
+        if key in _inflight:
+            result = await _inflight[key]
+        else:
+            future = asyncio.get_running_loop().create_future()
+            _inflight[key] = future
+            try:
+                async with _generate_semaphore:
+                    result = await generator.generate_and_execute_query(
+                        request.query,
+                        request.query_type,
+                        request.execute
+                    )
+                future.set_result(result)
+            except BaseException as e:
+                # BaseException so a client disconnect (CancelledError)
+                # also resolves the future — otherwise piggybacked
+                # duplicates would await it forever. Retrieve the exception
+                # immediately: if no duplicate piggybacked, nothing else
+                # ever awaits it and asyncio would log "exception was never
+                # retrieved" when it gets collected.
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()
+                raise
+            finally:
+                _inflight.pop(key, None)
         
-        # Convert to response model
-        return QueryResponse(
-            success=result.success,
-            sql_query=result.sql_query,
-            explanation=result.explanation,
-            data=result.data,
-            error=result.error,
-            execution_time=result.execution_time,
-            row_count=result.row_count,
-            confidence=result.confidence
+        # Encode the payload directly: returning a Response skips pydantic's
+        # re-validation of every row in data, which dominates for large
+        # result sets. response_model above still documents the shape.
+        payload = {
+            "success": result.success,
+            "sql_query": result.sql_query,
+            "explanation": result.explanation,
+            "data": result.data,
+            "error": result.error,
+            "execution_time": result.execution_time,
+            "row_count": result.row_count,
+            "confidence": result.confidence
+        }
+        return Response(
+            content=orjson.dumps(payload, default=str),
+            media_type="application/json"
         )
-        
+
     except Exception as e:
         logger.error(f"Error generating query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate/stream")
+async def generate_query_stream(request: QueryRequest):
+    """Generate a query and stream results as NDJSON: a header line with the
+    query metadata, then one line per result row. Clients can start parsing
+    rows before the full payload is serialized."""
+    if request.execution_mode not in _EXECUTION_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid execution mode. Choose from: {list(_EXECUTION_MODES.keys())}"
+        )
+
+    generator = get_generator(request.execution_mode)
+
+    # Direct-mode SELECTs stream straight off a server-side cursor: rows are
+    # never materialized as one Python list, and row_count is accumulated as
+    # they go out (emitted as a trailer line, since it isn't known up front).
+    if (request.execution_mode == "direct" and request.execute
+            and request.query_type.upper() == "SELECT"):
+        result = await generator.generate_and_execute_query(
+            request.query,
+            request.query_type,
+            execute=False
+        )
+
+        def stream_rows():
+            header = {
+                "success": result.success,
+                "sql_query": result.sql_query,
+                "explanation": result.explanation,
+                "error": result.error,
+                "execution_time": None,
+                "row_count": None,
+                "confidence": result.confidence
+            }
+            yield orjson.dumps(header) + b"\n"
+            if not result.success:
+                return
+            row_count = 0
+            try:
+                for row in db_manager.execute_query_iter(result.sql_query):
+                    row_count += 1
+                    yield orjson.dumps(row, default=str) + b"\n"
+                yield orjson.dumps({"row_count": row_count}) + b"\n"
+            except Exception as e:
+                yield orjson.dumps({"error": str(e), "row_count": row_count}) + b"\n"
+
+        # Sync generator on purpose: StreamingResponse iterates it on the
+        # threadpool, keeping the blocking cursor off the event loop.
+        return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+
+    result = await generator.generate_and_execute_query(
+        request.query,
+        request.query_type,
+        request.execute
+    )
+
+    async def stream():
+        header = {
+            "success": result.success,
+            "sql_query": result.sql_query,
+            "explanation": result.explanation,
+            "error": result.error,
+            "execution_time": result.execution_time,
+            "row_count": result.row_count,
+            "confidence": result.confidence
+        }
+        yield orjson.dumps(header) + b"\n"
+        for row in result.data or []:
+            yield orjson.dumps(row, default=str) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/schema")
 async def get_schema(table: Optional[str] = None):
     """Get database schema information."""
     try:
         if table:
-            schema_info = db_manager.get_table_schema(table)
+            # Run the blocking DB call on the default threadpool so the
+            # event loop stays free to multiplex other requests.
+            schema_info = await asyncio.to_thread(db_manager.get_table_schema, table)
             if not schema_info:
                 raise HTTPException(status_code=404, detail=f"Table '{table}' not found")
             return {"table": table, "columns": schema_info}
         else:
-            full_schema = db_manager.get_database_schema()
+            full_schema = await asyncio.to_thread(db_manager.get_database_schema)
             return {"schema": full_schema}
             
     except Exception as e:
         logger.error(f"Error retrieving schema: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/schema/refresh")
+async def refresh_schema():
+    """Invalidate the cached schema so the next lookup hits the database."""
+    db_manager.clear_schema_cache()
+    return {"status": "schema cache cleared"}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    db_status = db_manager.test_connection()
+    db_status = await asyncio.to_thread(db_manager.test_connection)
     
     return {
         "status": "healthy" if db_status else "unhealthy",
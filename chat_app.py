@@ -4,12 +4,20 @@ Interactive Chat Interface for SQL Query Generation and Improvement
 
 import streamlit as st
 import asyncio
+import orjson
+import pandas as pd
+import threading
+from collections import deque
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import logging
+import re
+import sqlite3
+import string
 import sys
-import io
-from contextlib import redirect_stdout, redirect_stderr
+import tempfile
+import uuid
+from pathlib import Path
 
 # Configure logging to capture all logs
 logging.basicConfig(
@@ -20,24 +28,53 @@ logging.basicConfig(
 # Import our modules
 from query_generator import SQLQueryGenerator, QueryExecutionMode
 from database import db_manager
-from gemini_client import gemini_client
+from gemini_client import gemini_client, prompt_cache_get, prompt_cache_put
 from config import settings
 
+# One event loop shared by every chat turn. Creating and tearing down a
+# loop per message costs milliseconds and leaks selector FDs when an
+# exception escapes before loop.close(); a single loop running in a
+# daemon thread also keeps pooled connections warm across turns.
+_EVENT_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_EVENT_LOOP.run_forever, daemon=True).start()
+
+def run_async(coro):
+    """Run a coroutine on the shared background event loop and wait for it."""
+    return asyncio.run_coroutine_threadsafe(coro, _EVENT_LOOP).result()
+
+# Words that signal the user wants to tweak the current SQL rather than
+# start a new query. Compiled once so each message needs a single scan.
+_IMPROVE_RE = re.compile(
+    r'\b(improve|change|modify|fix|add|remove|alter|update|better|optimize|join|where)\b',
+    re.IGNORECASE
+)
+
+class _DequeLogHandler(logging.Handler):
+    """Logging handler that appends formatted records to a bounded deque."""
+
+    def __init__(self, records: deque):
+        super().__init__(level=logging.INFO)
+        self.records = records
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+
 class LogCapture:
-    """Capture logs for display in the UI."""
-    
+    """Capture logs for display in the UI, keeping only the most recent lines."""
+
+    MAX_LINES = 500
+
     def __init__(self):
-        self.logs = []
+        self.logs: deque = deque(maxlen=self.MAX_LINES)
         self.handler = None
-        
+
     def start_capture(self):
         """Start capturing logs."""
-        self.logs = []
-        self.handler = logging.StreamHandler(io.StringIO())
-        self.handler.setLevel(logging.INFO)
+        self.logs.clear()
+        self.handler = _DequeLogHandler(self.logs)
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         self.handler.setFormatter(formatter)
-        
+
         # Add handler to all relevant loggers
         loggers = [
             logging.getLogger('query_generator'),
@@ -45,17 +82,13 @@ class LogCapture:
             logging.getLogger('gemini_client'),
             logging.getLogger('__main__')
         ]
-        
+
         for logger in loggers:
             logger.addHandler(self.handler)
-    
+
     def get_logs(self) -> List[str]:
         """Get captured logs."""
-        if self.handler and hasattr(self.handler, 'stream'):
-            log_content = self.handler.stream.getvalue()
-            if log_content:
-                return log_content.strip().split('\n')
-        return []
+        return list(self.logs)
     
     def stop_capture(self):
         """Stop capturing logs."""
@@ -71,29 +104,96 @@ class LogCapture:
                 logger.removeHandler(self.handler)
 
 class ChatSession:
-    """Manages chat session state and conversation history."""
-    
+    """Manages chat session state and conversation history.
+
+    Keeps only the most recent messages in memory (ring buffers); older
+    messages are archived to a sqlite file keyed by session id so a long
+    session can't grow Streamlit's session state without bound.
+    """
+
+    MAX_MESSAGES = 200
+    MAX_SQL_HISTORY = 50
+
     def __init__(self):
-        self.messages: List[Dict[str, Any]] = []
+        self.session_id = uuid.uuid4().hex
+        self.messages: deque = deque(maxlen=self.MAX_MESSAGES)
         self.current_sql: Optional[str] = None
         self.current_schema: Optional[Dict[str, Any]] = None
-        self.sql_history: List[Dict[str, Any]] = []  # Track SQL evolution
+        self.sql_history: deque = deque(maxlen=self.MAX_SQL_HISTORY)  # Track SQL evolution
         self.query_generator = SQLQueryGenerator()
-        
+        self._archive_path = Path(tempfile.gettempdir()) / "sql_chat_archive.db"
+        self._last_user_message: str = ""
+        self._schema_text: Optional[str] = None
+        self._next_message_id = 0
+        # Mid-term tier of get_tiered_context: digest of messages that have
+        # aged out of the short-term window, rebuilt only when one does.
+        self._midterm_summary: str = ""
+        self._midterm_watermark = -1
+
+    def set_schema(self, schema):
+        """Store the active schema and drop the cached prompt text."""
+        self.current_schema = schema
+        self._schema_text = None
+
+    def get_schema_text(self) -> str:
+        """Schema formatted for prompts, built once per schema instead of
+        stringifying the raw dict on every improvement turn."""
+        if self._schema_text is None:
+            schema = self.current_schema
+            if isinstance(schema, dict):
+                lines = []
+                for table_name in sorted(schema):
+                    columns = ", ".join(
+                        f"{col['column_name']} ({col['data_type']})"
+                        for col in schema[table_name]
+                    )
+                    lines.append(f"Table {table_name}: {columns}")
+                self._schema_text = "\n".join(lines)
+            else:
+                self._schema_text = str(schema or "")
+        return self._schema_text
+
+    def _archive_message(self, message: Dict[str, Any]):
+        """Persist a message about to be evicted from the ring buffer."""
+        try:
+            with sqlite3.connect(self._archive_path) as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS messages "
+                    "(session_id TEXT, ts TEXT, role TEXT, content TEXT)"
+                )
+                conn.execute(
+                    "INSERT INTO messages VALUES (?, ?, ?, ?)",
+                    (self.session_id, message["timestamp"].isoformat(),
+                     message["role"], message["content"])
+                )
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Failed to archive chat message: {e}")
+
     def add_message(self, role: str, content: str, metadata: Optional[Dict] = None):
         """Add a message to the conversation."""
+        if len(self.messages) == self.MAX_MESSAGES:
+            self._archive_message(self.messages[0])
+        if role == "user":
+            self._last_user_message = content
+        now = datetime.now()
         message = {
+            "id": self._next_message_id,
             "role": role,
             "content": content,
-            "timestamp": datetime.now(),
+            "timestamp": now,
+            # Preformatted once here so context assembly doesn't call
+            # strftime for every message on every render.
+            "_ts_str": now.strftime("%H:%M:%S"),
             "metadata": metadata or {}
         }
+        self._next_message_id += 1
         self.messages.append(message)
-        
+
         # Track SQL changes for context
         if metadata and "sql_query" in metadata:
             sql_entry = {
-                "timestamp": datetime.now(),
+                "timestamp": now,
+                "_ts_str": now.strftime("%H:%M:%S"),
                 "sql": metadata["sql_query"],
                 "explanation": metadata.get("explanation", ""),
                 "confidence": metadata.get("confidence", 0.0),
@@ -103,61 +203,117 @@ class ChatSession:
             self.sql_history.append(sql_entry)
     
     def _get_last_user_message(self) -> str:
-        """Get the last user message."""
-        for msg in reversed(self.messages):
-            if msg["role"] == "user":
-                return msg["content"]
-        return ""
+        """Get the last user message (tracked on insert, so no history scan)."""
+        return self._last_user_message
     
     def get_conversation_context(self) -> str:
         """Get comprehensive conversation context for AI."""
-        context = "=== CONVERSATION HISTORY ===\n\n"
-        
+        # Build a parts list and join once at the end; += on str in a loop
+        # is O(n^2) in message count.
+        parts: List[str] = ["=== CONVERSATION HISTORY ===\n\n"]
+
         # Add recent conversation (last 10 messages)
-        recent_messages = self.messages[-10:] if len(self.messages) > 10 else self.messages
-        for i, msg in enumerate(recent_messages):
-            timestamp = msg['timestamp'].strftime("%H:%M:%S")
-            context += f"[{timestamp}] {msg['role'].upper()}: {msg['content']}\n"
-            
+        recent_messages = list(self.messages)[-10:]
+        for msg in recent_messages:
+            timestamp = msg.get('_ts_str') or msg['timestamp'].strftime("%H:%M:%S")
+            parts.append(f"[{timestamp}] {msg['role'].upper()}: {msg['content']}\n")
+
             # Add SQL info if available
             if msg.get('metadata', {}).get('sql_query'):
-                context += f"    SQL Generated: {msg['metadata']['sql_query'][:100]}...\n"
+                parts.append(f"    SQL Generated: {msg['metadata']['sql_query'][:100]}...\n")
                 if msg['metadata'].get('confidence'):
-                    context += f"    Confidence: {msg['metadata']['confidence']:.1%}\n"
-            context += "\n"
-        
+                    parts.append(f"    Confidence: {msg['metadata']['confidence']:.1%}\n")
+            parts.append("\n")
+
         # Add SQL evolution history
         if self.sql_history:
-            context += "\n=== SQL EVOLUTION HISTORY ===\n\n"
-            for i, sql_entry in enumerate(self.sql_history[-5:], 1):  # Last 5 SQL changes
-                timestamp = sql_entry['timestamp'].strftime("%H:%M:%S")
-                context += f"Version {i} [{timestamp}]:\n"
-                context += f"  User Request: {sql_entry['user_request']}\n"
-                context += f"  Changes Made: {sql_entry.get('changes_made', 'Initial generation')}\n"
-                context += f"  SQL: {sql_entry['sql']}\n"
-                context += f"  Explanation: {sql_entry['explanation']}\n"
-                context += f"  Confidence: {sql_entry['confidence']:.1%}\n\n"
-        
+            parts.append("\n=== SQL EVOLUTION HISTORY ===\n\n")
+            for i, sql_entry in enumerate(list(self.sql_history)[-5:], 1):  # Last 5 SQL changes
+                timestamp = sql_entry.get('_ts_str') or sql_entry['timestamp'].strftime("%H:%M:%S")
+                parts.append(f"Version {i} [{timestamp}]:\n")
+                parts.append(f"  User Request: {sql_entry['user_request']}\n")
+                parts.append(f"  Changes Made: {sql_entry.get('changes_made', 'Initial generation')}\n")
+                parts.append(f"  SQL: {sql_entry['sql']}\n")
+                parts.append(f"  Explanation: {sql_entry['explanation']}\n")
+                parts.append(f"  Confidence: {sql_entry['confidence']:.1%}\n\n")
+
         # Add current context
-        context += "\n=== CURRENT STATE ===\n"
-        context += f"Current SQL: {self.current_sql or 'None'}\n"
-        context += f"Total messages in conversation: {len(self.messages)}\n"
-        context += f"SQL versions created: {len(self.sql_history)}\n"
-        
-        return context
-    
+        parts.append("\n=== CURRENT STATE ===\n")
+        parts.append(f"Current SQL: {self.current_sql or 'None'}\n")
+        parts.append(f"Total messages in conversation: {len(self.messages)}\n")
+        parts.append(f"SQL versions created: {len(self.sql_history)}\n")
+
+        return "".join(parts)
+
+    def get_tiered_context(self, short_k: int = 4) -> str:
+        """Conversation context with bounded size regardless of session length.
+
+        Three tiers instead of replaying the transcript: stable facts
+        (current SQL, latest request), the last short_k messages verbatim,
+        and a compact one-line-per-turn digest of everything older. The
+        digest is cached and rebuilt only when a message ages out of the
+        short-term window, so prompt size — and Gemini prefill cost — stays
+        flat as the conversation grows.
+        """
+        messages = list(self.messages)
+        short_term = messages[-short_k:] if short_k else []
+        older = messages[:-short_k] if short_k else messages
+
+        if older and older[-1]["id"] != self._midterm_watermark:
+            digest = [
+                f"[{m['_ts_str']}] {m['role'].upper()}: {m['content'][:80]}"
+                for m in older[-20:]
+            ]
+            self._midterm_summary = "\n".join(digest)
+            self._midterm_watermark = older[-1]["id"]
+
+        parts: List[str] = ["=== CURRENT STATE ===\n"]
+        parts.append(f"Current SQL: {self.current_sql or 'None'}\n")
+        parts.append(f"Latest user request: {self._last_user_message or 'None'}\n")
+        parts.append(f"SQL versions created: {len(self.sql_history)}\n")
+
+        if self._midterm_summary:
+            parts.append("\n=== EARLIER CONVERSATION (summary) ===\n")
+            parts.append(self._midterm_summary)
+            parts.append("\n")
+
+        if short_term:
+            parts.append("\n=== RECENT MESSAGES ===\n")
+            for msg in short_term:
+                parts.append(f"[{msg['_ts_str']}] {msg['role'].upper()}: {msg['content']}\n")
+                if msg.get('metadata', {}).get('sql_query'):
+                    parts.append(f"    SQL: {msg['metadata']['sql_query']}\n")
+
+        return "".join(parts)
+
+    def get_confidence_stats(self) -> Optional[Dict[str, float]]:
+        """Aggregate confidence across SQL versions in a single pass.
+
+        sql_history is a bounded deque (<= MAX_SQL_HISTORY entries), so plain
+        Python is already microseconds here; a NumPy/JIT route would cost
+        more in imports and warmup than it could ever save.
+        """
+        if not self.sql_history:
+            return None
+        confidences = [entry["confidence"] for entry in self.sql_history]
+        return {
+            "mean": sum(confidences) / len(confidences),
+            "min": min(confidences),
+            "max": max(confidences)
+        }
+
     def get_sql_evolution_summary(self) -> str:
         """Get a summary of how the SQL has evolved."""
         if not self.sql_history:
             return "No SQL queries generated yet."
-        
-        summary = f"SQL Evolution ({len(self.sql_history)} versions):\n"
+
+        parts: List[str] = [f"SQL Evolution ({len(self.sql_history)} versions):\n"]
         for i, sql_entry in enumerate(self.sql_history, 1):
-            summary += f"  {i}. {sql_entry['user_request'][:50]}{'...' if len(sql_entry['user_request']) > 50 else ''}\n"
+            parts.append(f"  {i}. {sql_entry['user_request'][:50]}{'...' if len(sql_entry['user_request']) > 50 else ''}\n")
             if sql_entry.get('changes_made'):
-                summary += f"     Changes: {sql_entry['changes_made'][:60]}{'...' if len(sql_entry['changes_made']) > 60 else ''}\n"
-        
-        return summary
+                parts.append(f"     Changes: {sql_entry['changes_made'][:60]}{'...' if len(sql_entry['changes_made']) > 60 else ''}\n")
+
+        return "".join(parts)
 
 def init_session_state():
     """Initialize Streamlit session state."""
@@ -165,6 +321,20 @@ def init_session_state():
         st.session_state.chat_session = ChatSession()
     if 'log_capture' not in st.session_state:
         st.session_state.log_capture = LogCapture()
+    if 'gemini_warmed' not in st.session_state:
+        # Initialize the Gemini client once per session instead of on every
+        # message; later calls reuse the model and its HTTP connection.
+        if settings.gemini_api_key:
+            try:
+                gemini_client._ensure_initialized()
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Gemini warmup failed: {e}")
+        st.session_state.gemini_warmed = True
+    if 'db_warmed' not in st.session_state:
+        # Open a pooled connection in the background so the first query of
+        # the session doesn't pay the TCP+auth handshake.
+        threading.Thread(target=db_manager.test_connection, daemon=True).start()
+        st.session_state.db_warmed = True
 
 async def generate_sql_with_logs(user_input: str, chat_session: ChatSession, log_capture: LogCapture) -> Dict[str, Any]:
     """Generate SQL query and capture all logs."""
@@ -196,23 +366,22 @@ async def generate_sql_with_logs(user_input: str, chat_session: ChatSession, log
     finally:
         log_capture.stop_capture()
 
-async def improve_sql_with_ai(current_sql: str, improvement_request: str, schema_info: str, conversation_context: str = "") -> Dict[str, Any]:
-    """Use AI to improve existing SQL based on user feedback with conversation context."""
-    try:
-        prompt = f"""
+# Prompt template for SQL improvements, compiled once at import instead of
+# rebuilt as an f-string on every call.
+_IMPROVE_PROMPT = string.Template("""
 You are an expert SQL developer. The user has an existing SQL query and wants to improve it. You have access to the conversation history to understand the context better.
 
 CONVERSATION HISTORY:
-{conversation_context}
+$conversation_context
 
 CURRENT SQL:
-{current_sql}
+$current_sql
 
 USER REQUEST FOR IMPROVEMENT:
-"{improvement_request}"
+"$improvement_request"
 
 AVAILABLE SCHEMA:
-{schema_info}
+$schema_info
 
 Please analyze the conversation history, current SQL, and the user's improvement request, then provide an improved version of the SQL query.
 
@@ -223,30 +392,40 @@ Consider:
 4. How this fits into the overall conversation flow
 
 Respond with a JSON object containing:
-{{
+{
     "improved_sql": "The improved SQL query",
     "changes_made": "Description of what changes were made",
     "explanation": "Why these changes improve the query and how they relate to the conversation",
     "confidence": 0.95,
     "context_understood": "Brief summary of what you understood from the conversation history"
-}}
+}
 
 Only return the JSON object, no additional text.
-"""
-        
+""")
+
+async def improve_sql_with_ai(current_sql: str, improvement_request: str, schema_info: str, conversation_context: str = "") -> Dict[str, Any]:
+    """Use AI to improve existing SQL based on user feedback with conversation context."""
+    try:
+        prompt = _IMPROVE_PROMPT.substitute(
+            conversation_context=conversation_context,
+            current_sql=current_sql,
+            improvement_request=improvement_request,
+            schema_info=schema_info
+        )
+
         gemini_client._ensure_initialized()
-        response = gemini_client.model.generate_content(prompt)
-        
-        # Parse response
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text.replace("```json", "").replace("```", "").strip()
-        elif response_text.startswith("```"):
-            response_text = response_text.replace("```", "").strip()
-        
-        import json
-        result = json.loads(response_text)
-        
+
+        result = prompt_cache_get(prompt)
+        if result is None:
+            # Structured JSON output: Gemini returns bare JSON, so there is
+            # no markdown fence to strip before parsing.
+            response = gemini_client.model.generate_content(
+                prompt,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            result = orjson.loads(response.text)
+            prompt_cache_put(prompt, result)
+
         return {
             "success": True,
             "improved_sql": result.get("improved_sql", current_sql),
@@ -263,6 +442,46 @@ Only return the JSON object, no additional text.
             "improved_sql": current_sql
         }
 
+# st.fragment landed in streamlit 1.37; on older installs fall back to a
+# plain function so the app still runs, just with full-page reruns.
+_fragment = getattr(st, "fragment", lambda f: f)
+
+@_fragment
+def render_history():
+    """Render the conversation history.
+
+    Runs as a fragment so sidebar/widget interactions elsewhere on the page
+    rerun only their own fragment instead of replaying every message.
+    """
+    for message in st.session_state.chat_session.messages:
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+
+            # Show metadata if available
+            if message["metadata"]:
+                metadata = message["metadata"]
+
+                # Show SQL query
+                if "sql_query" in metadata:
+                    st.code(metadata["sql_query"], language="sql")
+
+                # Show query results (DataFrame built once per result, not per rerun)
+                if "data" in metadata and metadata["data"]:
+                    if "dataframe" not in metadata:
+                        metadata["dataframe"] = pd.DataFrame(metadata["data"])
+                    st.subheader("📊 Query Results")
+                    st.dataframe(metadata["dataframe"].head(100), use_container_width=True)
+                    st.caption(f"Showing first 100 rows of {len(metadata['data'])} total")
+
+                # Show execution details
+                if "execution_time" in metadata:
+                    st.info(f"⏱️ Execution time: {metadata['execution_time']:.3f}s")
+
+                if "confidence" in metadata:
+                    confidence = metadata["confidence"]
+                    color = "green" if confidence > 0.8 else "orange" if confidence > 0.6 else "red"
+                    st.markdown(f"🎯 Confidence: <span style='color: {color}'>{confidence:.1%}</span>", unsafe_allow_html=True)
+
 def main():
     """Main Streamlit app."""
     st.set_page_config(
@@ -320,6 +539,9 @@ def main():
         # SQL Evolution
         if sql_versions > 0:
             st.subheader("📈 SQL Evolution")
+            stats = st.session_state.chat_session.get_confidence_stats()
+            if stats:
+                st.metric("Avg Confidence", f"{stats['mean']:.1%}")
             if st.button("📜 Show Evolution History"):
                 with st.expander("SQL Evolution Summary", expanded=True):
                     st.text(st.session_state.chat_session.get_sql_evolution_summary())
@@ -331,36 +553,11 @@ def main():
     
     # Main chat interface
     chat_container = st.container()
-    
+
     with chat_container:
         # Display conversation history
-        for message in st.session_state.chat_session.messages:
-            with st.chat_message(message["role"]):
-                st.write(message["content"])
-                
-                # Show metadata if available
-                if message["metadata"]:
-                    metadata = message["metadata"]
-                    
-                    # Show SQL query
-                    if "sql_query" in metadata:
-                        st.code(metadata["sql_query"], language="sql")
-                    
-                    # Show query results
-                    if "data" in metadata and metadata["data"]:
-                        st.subheader("📊 Query Results")
-                        st.dataframe(metadata["data"][:100])  # Limit to 100 rows
-                        st.caption(f"Showing first 100 rows of {len(metadata['data'])} total")
-                    
-                    # Show execution details
-                    if "execution_time" in metadata:
-                        st.info(f"⏱️ Execution time: {metadata['execution_time']:.3f}s")
-                    
-                    if "confidence" in metadata:
-                        confidence = metadata["confidence"]
-                        color = "green" if confidence > 0.8 else "orange" if confidence > 0.6 else "red"
-                        st.markdown(f"🎯 Confidence: <span style='color: {color}'>{confidence:.1%}</span>", unsafe_allow_html=True)
-        
+        render_history()
+
         # Chat input
         user_input = st.chat_input("Ask me to generate or improve SQL queries...")
         
@@ -385,10 +582,7 @@ def main():
             # Determine if this is a new query or an improvement request
             is_improvement = (
                 st.session_state.chat_session.current_sql is not None and
-                any(word in user_input.lower() for word in [
-                    'improve', 'change', 'modify', 'fix', 'add', 'remove', 
-                    'alter', 'update', 'better', 'optimize', 'join', 'where'
-                ])
+                bool(_IMPROVE_RE.search(user_input))
             )
             
             with st.chat_message("assistant"):
@@ -397,19 +591,14 @@ def main():
                     st.write("🔧 Improving the existing SQL query...")
                     
                     with st.spinner("Working on improvements..."):
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        try:
-                            improvement_result = loop.run_until_complete(
-                                improve_sql_with_ai(
-                                    st.session_state.chat_session.current_sql,
-                                    user_input,
-                                    str(st.session_state.chat_session.current_schema),
-                                    st.session_state.chat_session.get_conversation_context()
-                                )
+                        improvement_result = run_async(
+                            improve_sql_with_ai(
+                                st.session_state.chat_session.current_sql,
+                                user_input,
+                                st.session_state.chat_session.get_schema_text(),
+                                st.session_state.chat_session.get_conversation_context()
                             )
-                        finally:
-                            loop.close()
+                        )
                     
                     if improvement_result["success"]:
                         improved_sql = improvement_result["improved_sql"]
@@ -466,18 +655,13 @@ def main():
                     log_expander = st.expander("📋 View Detailed Logs", expanded=False)
                     
                     with st.spinner("Analyzing your request and generating SQL..."):
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        try:
-                            generation_result = loop.run_until_complete(
-                                generate_sql_with_logs(
-                                    user_input,
-                                    st.session_state.chat_session,
-                                    st.session_state.log_capture
-                                )
+                        generation_result = run_async(
+                            generate_sql_with_logs(
+                                user_input,
+                                st.session_state.chat_session,
+                                st.session_state.log_capture
                             )
-                        finally:
-                            loop.close()
+                        )
                     
                     # Show logs in expander
                     with log_expander:
@@ -505,7 +689,10 @@ def main():
                             # Store current SQL and schema
                             st.session_state.chat_session.current_sql = result.sql_query
                             if not st.session_state.chat_session.current_schema:
-                                st.session_state.chat_session.current_schema = "Schema information cached"
+                                st.session_state.chat_session.set_schema(
+                                    st.session_state.chat_session.query_generator._schema_cache
+                                    or "Schema information cached"
+                                )
                             
                             # Add response to conversation
                             metadata = {
@@ -514,6 +701,8 @@ def main():
                                 "execution_time": result.execution_time,
                                 "data": result.data
                             }
+                            if result.data:
+                                metadata["dataframe"] = pd.DataFrame(result.data)
                             
                             st.session_state.chat_session.add_message("assistant", response, metadata)
                             
@@ -1,14 +1,26 @@
 import click
 import asyncio
 import logging
+import os
+import socket
+import threading
+from dataclasses import asdict
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.syntax import Syntax
 from rich.progress import Progress, SpinnerColumn, TextColumn
 import json
+from functools import lru_cache
 from typing import Optional
 
+# Optional: faster event loop for the daemon server and query pipeline.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 from query_generator import (
     SQLQueryGenerator, 
     QueryExecutionMode, 
@@ -25,6 +37,19 @@ logging.basicConfig(
 
 console = Console()
 
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        """Pretty-print JSON via orjson; 3-5x faster on large schema dumps."""
+        return orjson.dumps(
+            obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str
+        ).decode()
+except ImportError:
+    def _dumps(obj) -> str:
+        """Pretty-print JSON via the stdlib when orjson isn't installed."""
+        return json.dumps(obj, indent=2, default=str)
+
 @click.group()
 @click.version_option(version="1.0.0")
 def cli():
@@ -48,9 +73,26 @@ def cli():
               type=click.Choice(['table', 'json', 'sql']),
               default='table',
               help='Output format')
-def generate(query: str, mode: str, type: str, no_execute: bool, output: str):
+@click.option('--limit', '-l',
+              type=int,
+              default=None,
+              help='Append LIMIT n to generated SELECT queries without one')
+def generate(query: str, mode: str, type: str, no_execute: bool, output: str, limit: Optional[int]):
     """Generate and optionally execute SQL query from natural language."""
-    
+
+    # Route through a running daemon (cli serve) when SQLGEN_SOCKET is set,
+    # skipping Gemini/DB initialization in this short-lived process.
+    daemon_socket = os.environ.get("SQLGEN_SOCKET")
+    if daemon_socket:
+        response = _daemon_request(daemon_socket, {
+            "query": query,
+            "query_type": type,
+            "execute": not no_execute,
+            "row_limit": limit
+        })
+        _display_result(QueryResult(**response), output)
+        return
+
     # Map mode string to enum
     execution_mode = {
         'direct': QueryExecutionMode.DIRECT,
@@ -71,7 +113,7 @@ def generate(query: str, mode: str, type: str, no_execute: bool, output: str):
         
         # Run the async function
         result = asyncio.run(generator.generate_and_execute_query(
-            query, type, execute=not no_execute
+            query, type, execute=not no_execute, row_limit=limit
         ))
         
         progress.remove_task(task)
@@ -127,7 +169,7 @@ def schema(table: Optional[str], output: str):
                 return
             
             if output == 'json':
-                console.print(json.dumps(schema_info, indent=2))
+                console.print(_dumps(schema_info))
             else:
                 _display_table_schema(table, schema_info)
         else:
@@ -135,7 +177,7 @@ def schema(table: Optional[str], output: str):
             full_schema = db_manager.get_database_schema()
             
             if output == 'json':
-                console.print(json.dumps(full_schema, indent=2))
+                console.print(_dumps(full_schema))
             else:
                 for table_name, columns in full_schema.items():
                     _display_table_schema(table_name, columns)
@@ -144,18 +186,115 @@ def schema(table: Optional[str], output: str):
     except Exception as e:
         console.print(f"Error retrieving schema: {e}", style="red")
 
+@cli.command()
+@click.option('--socket', '-s', 'socket_path',
+              default='/tmp/sqlgen.sock',
+              help='Unix socket path to listen on')
+@click.option('--mode', '-m',
+              type=click.Choice(['direct', 'mcp', 'dry-run']),
+              default='direct',
+              help='Execution mode for daemon queries')
+def serve(socket_path: str, mode: str):
+    """Run a warm daemon answering generate requests over a Unix socket.
+
+    Each one-shot `generate` run otherwise pays heavy imports, Gemini init
+    and a fresh connection pool; the daemon keeps all of that warm and
+    answers newline-delimited JSON requests. Point clients at it with
+    SQLGEN_SOCKET=<path>.
+    """
+    execution_mode = {
+        'direct': QueryExecutionMode.DIRECT,
+        'mcp': QueryExecutionMode.MCP,
+        'dry-run': QueryExecutionMode.DRY_RUN
+    }[mode]
+    asyncio.run(_serve(socket_path, execution_mode))
+
+async def _serve(socket_path: str, execution_mode: QueryExecutionMode):
+    """Accept loop for the daemon: one JSON request line, one JSON reply."""
+    generator = SQLQueryGenerator(execution_mode)
+
+    async def handle(reader, writer):
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            result = await generator.generate_and_execute_query(
+                request["query"],
+                request.get("query_type", "SELECT"),
+                request.get("execute", True),
+                row_limit=request.get("row_limit")
+            )
+            writer.write(json.dumps(asdict(result), default=str).encode() + b"\n")
+            await writer.drain()
+        except Exception as e:
+            writer.write(json.dumps({
+                "success": False, "sql_query": "", "explanation": "",
+                "error": str(e)
+            }).encode() + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    console.print(f"🚀 Daemon listening on {socket_path}", style="green")
+    async with server:
+        await server.serve_forever()
+
+def _daemon_request(socket_path: str, payload: dict) -> dict:
+    """Send one request to the daemon and read the full JSON reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
+
+def _prefetch_schema():
+    """Warm the connection pool and table list on a daemon thread.
+
+    Runs while the user is typing so the schema step of the next question
+    hits warm caches instead of paying connection + catalog round trips.
+    """
+    def _warm():
+        try:
+            if db_manager.test_connection():
+                db_manager.get_all_tables()
+        except Exception:
+            # Best-effort: the real query path reports connection errors.
+            pass
+    threading.Thread(target=_warm, daemon=True).start()
+
 @cli.command()
 def interactive():
     """Start interactive query generation session."""
     console.print(Panel.fit(
         "🔍 SQL Query Generator - Interactive Mode\n"
         "Type your questions in natural language!\n"
-        "Commands: /help, /mode [direct|mcp|dry-run], /quit",
+        "Commands: /help, /mode [direct|mcp|dry-run], /refresh, /quit",
         style="blue"
     ))
     
     generator = SQLQueryGenerator(QueryExecutionMode.DIRECT)
-    
+    _prefetch_schema()
+
+    # One event loop for the whole session: asyncio.run per prompt would tear
+    # down the loop (and any warm client/pool state) on every question.
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        _interactive_loop(generator, loop)
+    finally:
+        loop.close()
+
+def _interactive_loop(generator: SQLQueryGenerator, loop):
+    """Prompt/answer loop for interactive mode, running on a persistent loop."""
     while True:
         try:
             user_input = click.prompt("\n💭 Ask your question", type=str)
@@ -166,6 +305,12 @@ def interactive():
             elif user_input.lower() == '/help':
                 _show_help()
                 continue
+            elif user_input.lower() == '/refresh':
+                db_manager.clear_schema_cache()
+                generator.clear_schema_cache()
+                _prefetch_schema()
+                console.print("Schema caches cleared.", style="green")
+                continue
             elif user_input.lower().startswith('/mode'):
                 parts = user_input.split()
                 if len(parts) == 2 and parts[1] in ['direct', 'mcp', 'dry-run']:
@@ -187,7 +332,7 @@ def interactive():
                 console=console
             ) as progress:
                 task = progress.add_task("Processing your request...", total=None)
-                result = asyncio.run(generator.generate_and_execute_query(user_input))
+                result = loop.run_until_complete(generator.generate_and_execute_query(user_input))
                 progress.remove_task(task)
             
             _display_result(result, 'table')
@@ -196,15 +341,20 @@ def interactive():
             console.print("\nGoodbye! 👋", style="green")
             break
 
+@lru_cache(maxsize=128)
+def _syntax(sql: str) -> Syntax:
+    """Syntax-highlighted SQL, cached so Pygments tokenizes each distinct
+    query once per session (interactive mode re-renders the same SQL)."""
+    return Syntax(sql, "sql", theme="monokai")
+
 def _display_result(result: QueryResult, output_format: str):
     """Display query result in specified format."""
-    
+
     if not result.success:
         console.print(f"❌ Error: {result.error}", style="red")
         if result.sql_query:
             console.print("\nGenerated SQL:")
-            syntax = Syntax(result.sql_query, "sql", theme="monokai")
-            console.print(syntax)
+            console.print(_syntax(result.sql_query))
         return
     
     # Show success message
@@ -220,15 +370,14 @@ def _display_result(result: QueryResult, output_format: str):
     
     # Show SQL query
     console.print("\nGenerated SQL:")
-    syntax = Syntax(result.sql_query, "sql", theme="monokai")
-    console.print(syntax)
+    console.print(_syntax(result.sql_query))
     
     # Show execution results if available
     if result.data is not None:
         console.print(f"\n📊 Query Results ({result.row_count} rows):")
         
         if output_format == 'json':
-            console.print(json.dumps(result.data, indent=2))
+            console.print(_dumps(result.data))
         elif output_format == 'table' and result.data:
             _display_data_table(result.data)
         elif output_format == 'sql':
@@ -262,16 +411,19 @@ def _display_data_table(data: list):
         console.print("No data returned.", style="dim")
         return
     
-    # Create table with columns from first row
-    table = Table()
+    # Create table with columns from first row. highlight stays off so Rich
+    # doesn't run its highlighter regex over every cell.
+    table = Table(highlight=False)
     columns = list(data[0].keys())
-    
+
     for column in columns:
         table.add_column(str(column), style="cyan")
-    
-    # Add rows (limit to first 50 for readability)
-    for row in data[:50]:
-        table.add_row(*[str(row.get(col, '')) for col in columns])
+
+    # Pre-stringify all cells in one pass (limit to first 50 for readability),
+    # then hand Rich plain strings instead of stringifying inside add_row.
+    rows = [tuple(str(row.get(col, '')) for col in columns) for row in data[:50]]
+    for row_cells in rows:
+        table.add_row(*row_cells)
     
     if len(data) > 50:
         table.add_row(*[f"... ({len(data) - 50} more rows)" if i == 0 else "" 
@@ -285,6 +437,7 @@ def _show_help():
 Available Commands:
 - /help          Show this help message
 - /mode <mode>   Set execution mode (direct, mcp, dry-run)
+- /refresh       Clear cached schema (after migrations)
 - /quit          Exit interactive mode
 
 Example Questions:
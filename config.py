@@ -1,45 +1,62 @@
 import os
 from pathlib import Path
+from functools import lru_cache
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 from typing import Optional
 
-# Load environment variables
-load_dotenv()
+# BaseSettings reads .env itself (see Config below); this early load only
+# helps code that reads os.environ directly and can be skipped for faster
+# cold starts.
+if not os.environ.get("SQLGEN_SKIP_DOTENV"):
+    load_dotenv()
 
 class Settings(BaseSettings):
-    """Application settings loaded from environment variables."""
-    
+    """Application settings loaded from environment variables.
+
+    Defaults are plain values: BaseSettings resolves the matching env vars
+    itself, so calling os.getenv() per field would read the environment
+    twice.
+    """
+
     # Gemini API settings
-    gemini_api_key: str = os.getenv("GEMINI_API_KEY", "")
-    
+    gemini_api_key: str = ""
+    gemini_max_concurrency: int = 8
+
     # Database settings
-    db_host: str = os.getenv("DB_HOST", "localhost")
-    db_port: int = int(os.getenv("DB_PORT", "5432"))
-    db_name: str = os.getenv("DB_NAME", "")
-    db_user: str = os.getenv("DB_USER", "")
-    db_password: str = os.getenv("DB_PASSWORD", "")
-    
+    db_host: str = "localhost"
+    db_port: int = 5432
+    db_name: str = ""
+    db_user: str = ""
+    db_password: str = ""
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 20
+
     # MCP settings
-    mcp_server_url: str = os.getenv("MCP_SERVER_URL", "http://localhost:8080")
-    mcp_server_name: str = os.getenv("MCP_SERVER_NAME", "postgres-mcp-server")
-    
+    mcp_server_url: str = "http://localhost:8080"
+    mcp_server_name: str = "postgres-mcp-server"
+
     # Application settings
-    debug: bool = os.getenv("DEBUG", "True").lower() == "true"
-    log_level: str = os.getenv("LOG_LEVEL", "INFO")
-    
+    debug: bool = True
+    log_level: str = "INFO"
+
     # Performance settings
-    max_schema_tables: int = int(os.getenv("MAX_SCHEMA_TABLES", "50"))
-    schema_cache_timeout: int = int(os.getenv("SCHEMA_CACHE_TIMEOUT", "300"))  # 5 minutes
-    
+    max_schema_tables: int = 50
+    schema_cache_timeout: int = 300  # 5 minutes
+
     @property
     def database_url(self) -> str:
         """Generate PostgreSQL connection URL."""
         return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
-    
+
     class Config:
         env_file = ".env"
         case_sensitive = False
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse settings once per process."""
+    return Settings()
+
 # Global settings instance
-settings = Settings() 
\ No newline at end of file
+settings = get_settings()
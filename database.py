@@ -1,16 +1,71 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
-from typing import List, Dict, Any, Optional
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
 import logging
+import time
 from config import settings
 import re
+from functools import lru_cache
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Matches a response wrapped in a ```json ... ``` (or bare ```) fence and
+# captures the body. One anchored scan, and unlike replace('```', '') it
+# can't strip backticks that belong to the content itself.
+_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*\n?(.*?)\n?\s*```\s*$', re.DOTALL)
+
+# Static prompt for AI table selection; only the dynamic fields are
+# substituted per call (JSON braces are doubled for str.format).
+_TABLE_SELECT_PROMPT = """
+You are a database expert helping to select the most relevant tables for a SQL query.
+
+USER QUERY: "{user_query}"
+
+AVAILABLE TABLES:
+{tables_list}
+
+Please analyze the user's request and select the {max_tables} most relevant tables that would be needed to fulfill this query.
+
+Consider:
+1. What data entities are mentioned in the query (employees, timesheets, departments, etc.)
+2. What operations are requested (joins, aggregations, filtering)
+3. Which tables likely contain the required columns
+4. Primary tables vs supporting/lookup tables
+
+Respond with a JSON object containing:
+{{
+    "selected_tables": ["table1", "table2", "table3"],
+    "reasoning": {{
+        "table1": "Why this table is essential",
+        "table2": "Why this table is needed",
+        "table3": "Why this table is relevant"
+    }},
+    "confidence": 0.95
+}}
+
+Only return the JSON object, no additional text.
+"""
+
+@lru_cache(maxsize=8)
+def _format_tables_list(tables: Tuple[str, ...]) -> str:
+    """Bulleted table list for prompts; the table set rarely changes, so the
+    ~10KB join is built once per distinct set instead of per Gemini call."""
+    return "\n".join(f"- {table}" for table in tables)
+
 class DatabaseManager:
     """Manages PostgreSQL database connections and operations."""
-    
+
     def __init__(self):
         self.connection_params = {
             'host': settings.db_host,
@@ -19,13 +74,35 @@ class DatabaseManager:
             'user': settings.db_user,
             'password': settings.db_password
         }
-    
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._pool_lock = Lock()
+        self._schema_cache: Dict[Any, Tuple[float, Any]] = {}
+        self._schema_cache_lock = Lock()
+        self._table_token_cache: Dict[str, frozenset] = {}
+        self._prefix_index: Dict[str, List[str]] = {}
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """Get the connection pool, creating it lazily on first use."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    logger.info(
+                        f"🏊 Creating connection pool "
+                        f"({settings.db_pool_min_size}-{settings.db_pool_max_size} connections)"
+                    )
+                    self._pool = ThreadedConnectionPool(
+                        settings.db_pool_min_size,
+                        settings.db_pool_max_size,
+                        **self.connection_params
+                    )
+        return self._pool
+
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections."""
-        conn = None
+        """Context manager for pooled database connections."""
+        pool = self._get_pool()
+        conn = pool.getconn()
         try:
-            conn = psycopg2.connect(**self.connection_params)
             yield conn
         except psycopg2.Error as e:
             logger.error(f"Database connection error: {e}")
@@ -33,8 +110,15 @@ class DatabaseManager:
                 conn.rollback()
             raise
         finally:
-            if conn:
-                conn.close()
+            pool.putconn(conn)
+
+    def close_pool(self):
+        """Close all pooled connections (call on application shutdown)."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                logger.info("🏊 Connection pool closed")
     
     def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """Execute a SELECT query and return results as list of dictionaries."""
@@ -42,12 +126,30 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute(query, params)
-                    results = cursor.fetchall()
-                    return [dict(row) for row in results]
+                    # RealDictRow already is a dict subclass; copying each row
+                    # into a plain dict was an extra pass and N allocations.
+                    return cursor.fetchall()
         except psycopg2.Error as e:
             logger.error(f"Query execution error: {e}")
             raise
     
+    def execute_query_iter(self, query: str, params: Optional[tuple] = None, itersize: int = 1000):
+        """Stream a SELECT's rows using a named server-side cursor.
+
+        Rows arrive in batches of itersize instead of one fetchall(), so peak
+        memory stays flat no matter how large the result set is.
+        """
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor(name='sqlgen_stream', cursor_factory=RealDictCursor) as cursor:
+                    cursor.itersize = itersize
+                    cursor.execute(query, params)
+                    for row in cursor:
+                        yield row
+        except psycopg2.Error as e:
+            logger.error(f"Streaming query error: {e}")
+            raise
+
     def execute_non_query(self, query: str, params: Optional[tuple] = None) -> int:
         """Execute INSERT, UPDATE, DELETE queries and return affected rows count."""
         try:
@@ -60,8 +162,35 @@ class DatabaseManager:
             logger.error(f"Non-query execution error: {e}")
             raise
     
+    def _cached_schema(self, key: Any, loader: Callable[[], Any]) -> Any:
+        """Return a cached schema lookup, refreshing it when the TTL expires."""
+        now = time.time()
+        with self._schema_cache_lock:
+            entry = self._schema_cache.get(key)
+            if entry and now < entry[0]:
+                logger.info("📋 Schema cache hit for %s", key)
+                return entry[1]
+        value = loader()
+        with self._schema_cache_lock:
+            self._schema_cache[key] = (now + settings.schema_cache_timeout, value)
+        return value
+
+    def clear_schema_cache(self):
+        """Drop all cached schema lookups (e.g. after a migration)."""
+        with self._schema_cache_lock:
+            self._schema_cache.clear()
+        self._prefix_index.clear()
+        logger.info("📋 Schema cache cleared")
+
     def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
-        """Get schema information for a specific table."""
+        """Get schema information for a specific table (cached with a TTL)."""
+        return self._cached_schema(
+            ('table', table_name),
+            lambda: self._fetch_table_schema(table_name)
+        )
+
+    def _fetch_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
+        """Fetch schema information for a specific table from the database."""
         query = """
         SELECT 
             column_name,
@@ -76,7 +205,14 @@ class DatabaseManager:
         return self.execute_query(query, (table_name,))
     
     def get_all_tables(self) -> List[str]:
-        """Get list of all tables in the database."""
+        """Get list of all tables in the database (cached with a TTL)."""
+        return self._cached_schema(('all_tables',), self._fetch_all_tables)
+
+    def _fetch_all_tables(self) -> List[str]:
+        """Fetch the list of all tables from the database."""
+        # Fresh table list invalidates any prefix buckets built from the
+        # previous one.
+        self._prefix_index.clear()
         query = """
         SELECT table_name 
         FROM information_schema.tables 
@@ -88,12 +224,18 @@ class DatabaseManager:
     
     def get_relevant_tables(self, user_query: str = "", table_prefix: str = "dl_", max_tables: int = 20) -> List[str]:
         """Get tables that are relevant to the user query using AI-powered selection."""
-        # Get all tables with the specified prefix
+        # Get all tables with the specified prefix. get_all_tables() is
+        # TTL-cached and its refetch clears the prefix buckets, so going
+        # through it first keeps the bucket honest: on a cache hit this is
+        # a dict lookup, on expiry the bucket is rebuilt from fresh data.
         all_tables = self.get_all_tables()
-        prefixed_tables = [table for table in all_tables if table.startswith(table_prefix)]
-        
-        logger.info(f"📊 Found {len(prefixed_tables)} tables with prefix '{table_prefix}' (out of {len(all_tables)} total)")
-        logger.debug(f"🔍 All {table_prefix} tables: {prefixed_tables}")
+        prefixed_tables = self._prefix_index.get(table_prefix)
+        if prefixed_tables is None:
+            prefixed_tables = [table for table in all_tables if table.startswith(table_prefix)]
+            self._prefix_index[table_prefix] = prefixed_tables
+            logger.info("📊 Found %d tables with prefix '%s' (out of %d total)", len(prefixed_tables), table_prefix, len(all_tables))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 All %s tables: %s", table_prefix, prefixed_tables)
         
         if not user_query:
             # If no query provided, return first N prefixed tables
@@ -101,111 +243,143 @@ class DatabaseManager:
         
         if len(prefixed_tables) <= max_tables:
             # If we have fewer tables than the limit, return all
-            logger.info(f"🎯 Returning all {len(prefixed_tables)} prefixed tables (within limit)")
+            logger.info("🎯 Returning all %d prefixed tables (within limit)", len(prefixed_tables))
             return prefixed_tables
         
+        # Fast path: if the query literally names tables, skip the Gemini
+        # round trip and pad with token-overlap-ranked tables instead.
+        query_lower = user_query.lower()
+        explicit = [t for t in prefixed_tables if t.lower() in query_lower]
+        if explicit:
+            logger.info("⚡ Query names %d tables explicitly; skipping AI selection", len(explicit))
+            if len(explicit) < max_tables:
+                remaining = [t for t in prefixed_tables if t not in explicit]
+                explicit.extend(self._rank_tables_by_token_overlap(user_query, remaining))
+            return explicit[:max_tables]
+
         # Use AI to select the most relevant tables
-        logger.info(f"🤖 Using AI to select {max_tables} most relevant tables from {len(prefixed_tables)} candidates")
+        logger.info("🤖 Using AI to select %d most relevant tables from %d candidates", max_tables, len(prefixed_tables))
         return self._ai_select_relevant_tables(user_query, prefixed_tables, max_tables)
+
+    def _table_tokens(self, table_name: str) -> frozenset:
+        """Token set for a table name, computed once and cached."""
+        tokens = self._table_token_cache.get(table_name)
+        if tokens is None:
+            tokens = frozenset(part for part in table_name.lower().split('_') if part)
+            self._table_token_cache[table_name] = tokens
+        return tokens
+
+    def _rank_tables_by_token_overlap(self, user_query: str, tables: List[str]) -> List[str]:
+        """Rank tables by Jaccard similarity between name tokens and query words."""
+        query_tokens = set(re.findall(r'\w+', user_query.lower()))
+
+        def score(table_name: str) -> float:
+            tokens = self._table_tokens(table_name)
+            union = query_tokens | tokens
+            return len(query_tokens & tokens) / len(union) if union else 0.0
+
+        return sorted(tables, key=score, reverse=True)
     
-    def _ai_select_relevant_tables(self, user_query: str, available_tables: List[str], max_tables: int) -> List[str]:
-        """Use Gemini AI to select the most relevant tables for the user query."""
-        from gemini_client import gemini_client
-        import time
-        
-        start_time = time.time()
-        
-        # Create a prompt for table selection
-        tables_list = "\n".join([f"- {table}" for table in available_tables])
-        
-        prompt = f"""
-You are a database expert helping to select the most relevant tables for a SQL query.
+    @staticmethod
+    def _normalize_query(user_query: str) -> str:
+        """Canonicalize a natural-language query for cache keying."""
+        return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', '', user_query.lower())).strip()
 
-USER QUERY: "{user_query}"
+    def _ai_select_relevant_tables(self, user_query: str, available_tables: List[str],
+                                   max_tables: int, no_cache: bool = False) -> List[str]:
+        """Use Gemini AI to select the most relevant tables for the user query.
 
-AVAILABLE TABLES:
-{tables_list}
+        Results are cached per (normalized query, table set) so repeated
+        questions don't pay the 1-3s LLM round trip; pass no_cache=True to
+        force a fresh selection.
+        """
+        if no_cache:
+            return self._ai_select_relevant_tables_uncached(user_query, available_tables, max_tables)
+        key = ('ai_tables', self._normalize_query(user_query),
+               frozenset(available_tables), max_tables)
+        return self._cached_schema(
+            key,
+            lambda: self._ai_select_relevant_tables_uncached(user_query, available_tables, max_tables)
+        )
 
-Please analyze the user's request and select the {max_tables} most relevant tables that would be needed to fulfill this query.
+    def _ai_select_relevant_tables_uncached(self, user_query: str, available_tables: List[str],
+                                            max_tables: int) -> List[str]:
+        """Ask Gemini which tables matter for the query (uncached)."""
+        # Imported here, not at module top, to keep database importable
+        # without the Gemini stack and to avoid a database <-> gemini_client
+        # import tangle; the sys.modules lookup is cached after first use.
+        from gemini_client import gemini_client
 
-Consider:
-1. What data entities are mentioned in the query (employees, timesheets, departments, etc.)
-2. What operations are requested (joins, aggregations, filtering)
-3. Which tables likely contain the required columns
-4. Primary tables vs supporting/lookup tables
+        start_time = time.time()
 
-Respond with a JSON object containing:
-{{
-    "selected_tables": ["table1", "table2", "table3"],
-    "reasoning": {{
-        "table1": "Why this table is essential",
-        "table2": "Why this table is needed",
-        "table3": "Why this table is relevant"
-    }},
-    "confidence": 0.95
-}}
+        # Create a prompt for table selection
+        prompt = _TABLE_SELECT_PROMPT.format(
+            user_query=user_query,
+            tables_list=_format_tables_list(tuple(available_tables)),
+            max_tables=max_tables
+        )
 
-Only return the JSON object, no additional text.
-"""
-        
         try:
             # Ensure Gemini is initialized
             gemini_client._ensure_initialized()
             
-            logger.info(f"🤖 Calling Gemini for table selection...")
+            logger.info("🤖 Calling Gemini for table selection...")
             response = gemini_client.model.generate_content(prompt)
             
             # Parse the response
             response_text = response.text.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            elif response_text.startswith("```"):
-                response_text = response_text.replace("```", "").strip()
-            
-            import json
-            result = json.loads(response_text)
+            fence_match = _FENCE_RE.match(response_text)
+            if fence_match:
+                response_text = fence_match.group(1)
+
+            result = _json_loads(response_text)
             
             selected_tables = result.get("selected_tables", [])
             reasoning = result.get("reasoning", {})
             confidence = result.get("confidence", 0.0)
             
-            # Validate that selected tables exist in available tables
-            valid_tables = [t for t in selected_tables if t in available_tables]
-            
+            # Validate that selected tables exist in available tables; set
+            # membership keeps this O(N) instead of O(N*M) list scans, and
+            # dict.fromkeys dedupes while preserving the LLM's ordering.
+            available_set = set(available_tables)
+            valid_tables = list(dict.fromkeys(
+                t for t in selected_tables if t in available_set
+            ))
+            valid_set = set(valid_tables)
+
             if len(valid_tables) < max_tables and len(available_tables) > len(valid_tables):
                 # Add some additional tables if AI didn't select enough
-                remaining = [t for t in available_tables if t not in valid_tables]
+                remaining = [t for t in available_tables if t not in valid_set]
                 needed = max_tables - len(valid_tables)
                 valid_tables.extend(remaining[:needed])
-                logger.info(f"📝 Added {needed} additional tables to reach {max_tables} limit")
+                logger.info("📝 Added %d additional tables to reach %d limit", needed, max_tables)
             
             # Log the AI's reasoning
-            logger.info(f"🧠 AI Table Selection Results (confidence: {confidence:.1%}):")
+            logger.info("🧠 AI Table Selection Results (confidence: %.1f%%):", confidence * 100)
             for i, table in enumerate(valid_tables[:max_tables], 1):
                 reason = reasoning.get(table, "Selected by AI")
-                logger.info(f"  {i}. {table} - {reason}")
+                logger.info("  %d. %s - %s", i, table, reason)
             
             ai_time = time.time() - start_time
-            logger.info(f"✅ AI table selection completed in {ai_time:.2f}s")
+            logger.info("✅ AI table selection completed in %.2fs", ai_time)
             
             return valid_tables[:max_tables]
             
         except Exception as e:
             logger.error(f"❌ AI table selection failed: {e}")
-            logger.info(f"🔄 Falling back to first {max_tables} tables")
+            logger.info("🔄 Falling back to first %d tables", max_tables)
             return available_tables[:max_tables]
     
     def get_smart_database_schema(self, user_query: str = "", table_prefix: str = "dl_", max_tables: int = 20) -> Dict[str, List[Dict[str, Any]]]:
         """Get database schema for tables relevant to the user query."""
-        import time
         start_time = time.time()
-        logger.info(f"🧠 Starting smart schema retrieval for query: '{user_query}' with prefix '{table_prefix}'")
+        logger.info("🧠 Starting smart schema retrieval for query: '%s' with prefix '%s'", user_query, table_prefix)
         
         # Get relevant tables based on query and prefix
         relevant_tables = self.get_relevant_tables(user_query, table_prefix, max_tables)
         
         if not relevant_tables:
-            logger.warning(f"⚠️ No tables found with prefix '{table_prefix}'")
+            logger.warning("⚠️ No tables found with prefix '%s'", table_prefix)
             return {}
         
         # Get schema for relevant tables only
@@ -214,78 +388,167 @@ Only return the JSON object, no additional text.
         schema_time = time.time() - schema_start
         
         total_time = time.time() - start_time
-        logger.info(f"✅ Smart schema retrieval completed: {len(schema)} relevant tables in {total_time:.2f}s")
+        logger.info("✅ Smart schema retrieval completed: %d relevant tables in %.2fs", len(schema), total_time)
         
         return schema
-    
+
+    def get_smart_database_ddl(self, user_query: str = "", table_prefix: str = "dl_", max_tables: int = 20) -> str:
+        """Relevant tables rendered as CREATE TABLE DDL, ready for prompts.
+
+        The flat DDL string is several times smaller than the formatted
+        nested column dicts, so the prompt sent to Gemini shrinks with it.
+        Relevance filtering already happened here, so downstream code can
+        inject the text verbatim instead of filtering and formatting again.
+        """
+        schema = self.get_smart_database_schema(user_query, table_prefix, max_tables)
+        parts = []
+        for table_name, columns in sorted(schema.items()):
+            column_lines = []
+            for column in columns:
+                line = f"    {column['column_name']} {column['data_type']}"
+                if column.get('is_nullable') == 'NO':
+                    line += " NOT NULL"
+                if column.get('column_default'):
+                    line += f" DEFAULT {column['column_default']}"
+                column_lines.append(line)
+            parts.append(f"CREATE TABLE {table_name} (\n" + ",\n".join(column_lines) + "\n);")
+        return "\n\n".join(parts)
+
     def get_database_schema(self, max_tables: int = 50) -> Dict[str, List[Dict[str, Any]]]:
-        """Get complete database schema with optimizations for large databases."""
-        import time
+        """Get complete database schema, cached with a TTL between refreshes."""
+        return self._cached_schema(
+            ('database', max_tables),
+            lambda: self._fetch_database_schema(max_tables)
+        )
+
+    def _fetch_database_schema(self, max_tables: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch the database schema with optimizations for large databases."""
         start_time = time.time()
-        logger.info(f"📊 Starting optimized schema retrieval (max {max_tables} tables)...")
-        
-        # Get all tables first
-        tables = self.get_all_tables()
-        logger.info(f"📋 Found {len(tables)} total tables")
-        
-        # Limit tables for performance with large databases
-        if len(tables) > max_tables:
-            logger.warning(f"⚠️ Large database detected ({len(tables)} tables). Limiting to {max_tables} tables for performance.")
-            tables = tables[:max_tables]
-        
-        # Get schema for all tables in a single optimized query
-        schema_start = time.time()
-        schema = self._get_bulk_table_schema(tables)
-        schema_time = time.time() - schema_start
-        
+        logger.info("📊 Starting optimized schema retrieval (max %d tables)...", max_tables)
+
+        # Fetch the table list and all column metadata in a single round trip:
+        # a subquery picks the first max_tables tables, the outer query pulls
+        # their columns, and the rows are grouped in Python afterwards.
+        query = """
+        SELECT
+            c.table_name,
+            c.column_name,
+            c.data_type,
+            c.is_nullable,
+            c.column_default,
+            c.character_maximum_length,
+            c.ordinal_position
+        FROM information_schema.columns c
+        JOIN (
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema = 'public'
+            ORDER BY table_name
+            LIMIT %s
+        ) t ON c.table_name = t.table_name
+        WHERE c.table_schema = 'public'
+        ORDER BY c.table_name, c.ordinal_position;
+        """
+        results = self.execute_query(query, (max_tables,))
+
+        # Group results by table name
+        schema: Dict[str, List[Dict[str, Any]]] = {}
+        for row in results:
+            column_info = {k: v for k, v in row.items()
+                          if k not in ['table_name', 'ordinal_position']}
+            schema.setdefault(row['table_name'], []).append(column_info)
+
         total_time = time.time() - start_time
-        logger.info(f"✅ Schema retrieval completed: {len(schema)} tables in {total_time:.2f}s")
-        
+        logger.info("✅ Schema retrieval completed: %d tables in %.2fs", len(schema), total_time)
+
         return schema
     
     def _get_bulk_table_schema(self, table_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
-        """Get schema information for multiple tables in a single query."""
+        """Get schema information for multiple tables, cached with a TTL."""
+        return self._cached_schema(
+            ('bulk', tuple(sorted(table_names))),
+            lambda: self._fetch_bulk_table_schema(table_names)
+        )
+
+    # Above this many tables a single IN list tends to degenerate into a
+    # sequential information_schema scan; fan out per-table queries instead.
+    BULK_SCHEMA_PARALLEL_THRESHOLD = 200
+
+    def get_schemas_parallel(self, table_names: List[str], max_workers: int = 8) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch per-table schemas concurrently, each on its own pooled connection."""
         if not table_names:
             return {}
-        
-        # Create a single query to get all table schemas at once
-        placeholders = ','.join(['%s'] * len(table_names))
-        query = f"""
-        SELECT 
-            table_name,
-            column_name,
-            data_type,
-            is_nullable,
-            column_default,
-            character_maximum_length,
-            ordinal_position
-        FROM information_schema.columns 
-        WHERE table_name IN ({placeholders})
-        AND table_schema = 'public'
-        ORDER BY table_name, ordinal_position;
+        # Leave one pooled connection free so other callers aren't starved.
+        max_workers = max(1, min(max_workers, settings.db_pool_max_size - 1, len(table_names)))
+        logger.info("🧵 Fetching %d table schemas with %d workers", len(table_names), max_workers)
+        schema: Dict[str, List[Dict[str, Any]]] = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._fetch_table_schema, name): name
+                       for name in table_names}
+            for future in as_completed(futures):
+                schema[futures[future]] = future.result()
+        return schema
+
+    def _fetch_bulk_table_schema(self, table_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch schema information for multiple tables in a single query.
+
+        Deliberately one set-oriented statement rather than N concurrent
+        per-table queries: a lone information_schema scan beats fanning out
+        over the pool and there is no per-table fetch left to parallelize.
+        For very large table sets the IN list itself becomes the bottleneck,
+        so those fall back to get_schemas_parallel.
         """
+        if not table_names:
+            return {}
+
+        if len(table_names) > self.BULK_SCHEMA_PARALLEL_THRESHOLD:
+            return self.get_schemas_parallel(table_names)
         
-        logger.info(f"🔍 Executing bulk schema query for {len(table_names)} tables...")
-        results = self.execute_query(query, tuple(table_names))
+        # Query pg_catalog directly instead of the information_schema.columns
+        # view; the view joins half a dozen catalogs per row and is several
+        # times slower for wide table sets. Output columns keep the
+        # information_schema names and formats consumers expect.
+        # ANY(%s) takes the table names as one array parameter, so the SQL
+        # text is identical for every call and the server's plan is reused
+        # instead of re-parsing a distinct N-placeholder IN list per size.
+        query = """
+        SELECT
+            c.relname AS table_name,
+            a.attname AS column_name,
+            format_type(a.atttypid, NULL) AS data_type,
+            CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END AS is_nullable,
+            pg_get_expr(d.adbin, d.adrelid) AS column_default,
+            CASE WHEN a.atttypid IN (1042, 1043) AND a.atttypmod > 0
+                 THEN a.atttypmod - 4 END AS character_maximum_length,
+            a.attnum AS ordinal_position
+        FROM pg_catalog.pg_attribute a
+        JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_catalog.pg_attrdef d
+            ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE n.nspname = 'public'
+        AND c.relkind IN ('r', 'p', 'v', 'm')
+        AND c.relname = ANY(%s)
+        AND a.attnum > 0
+        AND NOT a.attisdropped
+        ORDER BY c.relname, a.attnum;
+        """
+
+        logger.info("🔍 Executing bulk schema query for %d tables...", len(table_names))
+        results = self.execute_query(query, (list(table_names),))
         
-        # Group results by table name
-        schema = {}
+        # Seed every requested table upfront (in request order, empty lists
+        # for missing tables), then group in one pass. Deleting the grouping
+        # keys mutates the row dict in place instead of rebuilding it per
+        # column, which matters on databases with thousands of columns.
+        schema = {table_name: [] for table_name in table_names}
+        column_count = len(results)
         for row in results:
-            table_name = row['table_name']
-            if table_name not in schema:
-                schema[table_name] = []
-            
-            # Remove table_name and ordinal_position from the column info
-            column_info = {k: v for k, v in row.items() 
-                          if k not in ['table_name', 'ordinal_position']}
-            schema[table_name].append(column_info)
-        
-        # Ensure all requested tables are in the result (even if empty)
-        for table_name in table_names:
-            if table_name not in schema:
-                schema[table_name] = []
-        
-        logger.info(f"📋 Bulk schema query returned {len(results)} columns across {len(schema)} tables")
+            table_name = row.pop('table_name')
+            del row['ordinal_position']
+            schema[table_name].append(row)
+
+        logger.info("📋 Bulk schema query returned %d columns across %d tables", column_count, len(schema))
         return schema
     
     def get_database_schema_full(self) -> Dict[str, List[Dict[str, Any]]]:
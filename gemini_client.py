@@ -1,13 +1,289 @@
-import google.generativeai as genai
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+import asyncio
+import hashlib
 import logging
 import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from config import settings
 import time
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# google.generativeai costs hundreds of ms to import; every CLI entry point
+# pulls this module in through query_generator, so defer the import until a
+# Gemini call is actually about to happen.
+genai = None
+
+def _load_genai():
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
+
+# One GenerativeModel for the whole process: the demo, chat app and query
+# pipeline each hold a GeminiSQLGenerator, and a per-instance model would
+# open its own TLS session instead of reusing the warm connection pool.
+_MODEL = None
+_model_lock = threading.Lock()
+
+def _get_model():
+    """Process-wide shared model, created on first use."""
+    global _MODEL
+    if _MODEL is None:
+        with _model_lock:
+            if _MODEL is None:
+                if not settings.gemini_api_key:
+                    raise ValueError("GEMINI_API_KEY not found in environment variables")
+                genai = _load_genai()
+                genai.configure(api_key=settings.gemini_api_key)
+                # JSON response mode: the model returns bare JSON, so
+                # parsing never has to strip markdown fences or fall back
+                # to prose extraction.
+                _MODEL = genai.GenerativeModel(
+                    'gemini-2.0-flash',
+                    generation_config={"response_mime_type": "application/json"},
+                )
+    return _MODEL
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # ~3x faster than stdlib on small payloads
+except ImportError:
+    _json_loads = json.loads
+
+# Exact-match prompt cache: identical (query, schema, type) prompts skip the
+# Gemini round trip entirely, which dwarfs any local optimization. Backed by
+# sqlite in the temp dir (same pattern as the chat archive) so demo reruns
+# and restarted sessions hit it too. Kill switch: GEMINI_CACHE_DISABLE=1.
+_PROMPT_CACHE_DISABLED = bool(os.environ.get("GEMINI_CACHE_DISABLE"))
+_PROMPT_CACHE_TTL = 24 * 3600  # same prompt + same schema → same SQL for a day
+_prompt_cache_lock = threading.Lock()
+_prompt_cache_conn: Optional[sqlite3.Connection] = None
+
+def _prompt_cache_db() -> sqlite3.Connection:
+    global _prompt_cache_conn
+    if _prompt_cache_conn is None:
+        path = os.path.join(tempfile.gettempdir(), "gemini_sql_cache.db")
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS prompt_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        conn.commit()
+        _prompt_cache_conn = conn
+    return _prompt_cache_conn
+
+def prompt_cache_get(prompt: str) -> Optional[Dict[str, Any]]:
+    """Return the cached result for this exact prompt, or None."""
+    if _PROMPT_CACHE_DISABLED:
+        return None
+    key = hashlib.sha256(prompt.encode()).hexdigest()
+    try:
+        with _prompt_cache_lock:
+            row = _prompt_cache_db().execute(
+                "SELECT value, created FROM prompt_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row and time.time() - row[1] < _PROMPT_CACHE_TTL:
+            return json.loads(row[0])
+    except Exception as e:
+        logger.debug("Prompt cache read failed: %s", e)
+    return None
+
+def prompt_cache_put(prompt: str, result: Dict[str, Any]) -> None:
+    """Store a successful generation result for this exact prompt."""
+    if _PROMPT_CACHE_DISABLED:
+        return
+    key = hashlib.sha256(prompt.encode()).hexdigest()
+    try:
+        with _prompt_cache_lock:
+            conn = _prompt_cache_db()
+            conn.execute(
+                "INSERT OR REPLACE INTO prompt_cache (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time()),
+            )
+            conn.commit()
+    except Exception as e:
+        logger.debug("Prompt cache write failed: %s", e)
+
+def _schema_fingerprint(schema_info) -> int:
+    """Process-local identity for a schema, string or dict form."""
+    if isinstance(schema_info, str):
+        return hash(schema_info)
+    return hash(_schema_cache_key(schema_info))
+
+class SemanticCache:
+    """Reuse generations for near-duplicate phrasings of the same question.
+
+    "get all companies with payments" and "list companies and their payment
+    amounts" miss the exact prompt cache but want the same SQL. Queries are
+    embedded once via the Gemini embedding model; a cosine similarity >= the
+    threshold against a stored query (for the same schema) returns the prior
+    result without a generation round trip. Entries live in memory for the
+    process lifetime, scanned linearly — at session scale (tens of queries)
+    a vector index would be overhead, not speedup.
+    """
+
+    EMBEDDING_MODEL = "models/text-embedding-004"
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 256):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # (normalized embedding, schema fingerprint, result)
+        self._entries: List[Tuple[List[float], int, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> Optional[List[float]]:
+        """Normalized embedding for text, or None if embedding fails."""
+        try:
+            response = _load_genai().embed_content(model=self.EMBEDDING_MODEL, content=text)
+            vector = response["embedding"]
+            norm = sum(v * v for v in vector) ** 0.5
+            if not norm:
+                return None
+            return [v / norm for v in vector]
+        except Exception as e:
+            logger.debug("Semantic cache embedding failed: %s", e)
+            return None
+
+    def match(self, vector: List[float], fingerprint: int) -> Optional[Dict[str, Any]]:
+        """Best stored result above the similarity threshold, or None."""
+        best_score, best_result = 0.0, None
+        with self._lock:
+            for stored_vector, stored_fp, result in self._entries:
+                if stored_fp != fingerprint:
+                    continue
+                score = sum(a * b for a, b in zip(vector, stored_vector))
+                if score > best_score:
+                    best_score, best_result = score, result
+        if best_result is not None and best_score >= self.threshold:
+            logger.info("📦 Semantic cache hit (similarity %.3f)", best_score)
+            return best_result
+        return None
+
+    def add(self, vector: List[float], fingerprint: int, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append((vector, fingerprint, result))
+            if len(self._entries) > self.max_entries:
+                del self._entries[0]
+
+_semantic_cache = SemanticCache()
+
+# Schema retrieval: below this many tables the whole schema goes into the
+# prompt; above it, only the top-K tables by embedding similarity to the
+# natural query. If no table clears the floor the retrieval is deemed
+# unreliable and the full schema is sent.
+_RETRIEVAL_MIN_TABLES = 8
+_RETRIEVAL_TOP_K = 5
+_RETRIEVAL_FLOOR = 0.3
+
+# (table name, column signature) -> normalized embedding; tables re-embed
+# only when their column set changes.
+_table_vector_cache: Dict[Tuple[str, int], List[float]] = {}
+
+# Prompt layout matters for provider-side prefix caching: everything static
+# (instructions, response format, schema) comes first and byte-identical
+# across calls, with the per-request portion strictly at the tail, so
+# repeated calls against the same schema hit Gemini's implicit prompt cache
+# instead of re-processing the full prefill.
+_SQL_GENERATION_PROMPT = """\
+You are an expert SQL query generator. Your task is to convert natural language requests into accurate PostgreSQL queries.
+
+Instructions:
+1. Generate a PostgreSQL-compatible SQL query that fulfills the user's request
+2. Use only the tables and columns from the provided schema
+3. Follow PostgreSQL syntax and best practices
+4. Include appropriate WHERE clauses, JOINs, and other necessary SQL constructs
+5. For SELECT queries, choose appropriate columns based on the request
+6. Ensure the query is safe and doesn't include any harmful operations
+
+Please respond with a JSON object containing:
+{{
+    "sql_query": "The generated SQL query",
+    "explanation": "Brief explanation of what the query does",
+    "confidence": 0.95,
+    "tables_used": ["list", "of", "table", "names", "used"]
+}}
+
+Only return the JSON object, no additional text.
+
+{schema_context}
+
+---
+User Request: "{user_query}"
+Expected Query Type: {query_type}
+"""
+
+# Statements and comment markers we refuse to run. One compiled search
+# replaces upper-casing the whole query and scanning it once per keyword;
+# ";--" needs no entry of its own since "--" already covers it.
+_UNSAFE_RE = re.compile(
+    r'\b(?:DROP|TRUNCATE|ALTER|CREATE|GRANT|REVOKE)\b'
+    r'|\bDELETE\s+FROM\b'
+    r'|--|/\*|\*/',
+    re.IGNORECASE,
+)
+
+@lru_cache(maxsize=512)
+def _unsafe_token(sql_query: str) -> Optional[str]:
+    """First unsafe keyword in the query, or None — memoized.
+
+    Iterative-improvement flows re-validate near-identical SQL repeatedly;
+    the scan is deterministic, so repeats are a dict lookup.
+    """
+    match = _UNSAFE_RE.search(sql_query)
+    return match.group(0) if match else None
+
+# Table headings in pre-formatted schema text ("TABLE: x" / "Table: x");
+# one findall pass replaces per-line split + startswith scans.
+# Table names in string schemas: legacy "Table: name" listings and the
+# CREATE TABLE DDL produced by db_manager.get_smart_database_ddl.
+_TABLE_RE = re.compile(r'^(?:(?:TABLE|Table):|CREATE TABLE)\s*(\S+)', re.MULTILINE)
+
+def _schema_cache_key(schema: Dict[str, List[Dict[str, Any]]]) -> Tuple:
+    """Hashable, order-stable key for a schema dict."""
+    return tuple(
+        (table_name, tuple(
+            (column['column_name'], column['data_type'],
+             column['character_maximum_length'], column['is_nullable'],
+             column['column_default'])
+            for column in columns
+        ))
+        for table_name, columns in sorted(schema.items())
+    )
+
+@lru_cache(maxsize=16)
+def _format_schema_cached(schema_key: Tuple) -> Tuple[str, Tuple[str, ...]]:
+    """Format a schema key into prompt text, plus its table names.
+
+    Cached because the same schema is re-sent on every generation in a
+    session; the O(columns) string build then happens once. The table list
+    comes back alongside so callers don't reparse the formatted text.
+    """
+    parts = ["Database Schema:\n"]
+
+    for table_name, columns in schema_key:
+        parts.append(f"\nTable: {table_name}\nColumns:\n")
+
+        for column_name, data_type, max_length, is_nullable, default in columns:
+            column_info = f"  - {column_name} ({data_type}"
+            if max_length:
+                column_info += f"({max_length})"
+            column_info += f", nullable: {is_nullable}"
+            if default:
+                column_info += f", default: {default}"
+            column_info += ")\n"
+            parts.append(column_info)
+
+    return "".join(parts), tuple(name for name, _ in schema_key)
+
 @dataclass
 class QueryResult:
     """Result of SQL query generation."""
@@ -27,122 +303,282 @@ class GeminiSQLGenerator:
         """Ensure the Gemini client is initialized."""
         if self._initialized:
             return
-            
-        if not settings.gemini_api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        
-        genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+
+        self.model = _get_model()
         self._initialized = True
     
     def generate_sql_query(self, natural_query: str, schema_info: str, query_type: str = "SELECT") -> Dict[str, Any]:
         """Generate SQL query from natural language using Gemini."""
-        start_time = time.time()
-        logger.info(f"🚀 Starting SQL query generation for: '{natural_query}'")
-        
+        start_time = time.perf_counter()
+        logger.info("🚀 Starting SQL query generation for: '%s'", natural_query)
+
+        prompt, tables_in_schema = self._prepare_prompt(natural_query, schema_info, query_type)
+
+        cached = prompt_cache_get(prompt)
+        if cached is not None:
+            logger.info("📦 Prompt cache hit, skipping Gemini call")
+            return cached
+
+        # Near-duplicate phrasings: an embedding round trip is far cheaper
+        # than a generation, so check the semantic cache before generating.
+        fingerprint = _schema_fingerprint(schema_info)
+        query_vector = None
+        if not _PROMPT_CACHE_DISABLED:
+            query_vector = _semantic_cache.embed(natural_query)
+            if query_vector is not None:
+                cached = _semantic_cache.match(query_vector, fingerprint)
+                if cached is not None:
+                    return cached
+
+        try:
+            # Call Gemini API
+            api_start = time.perf_counter()
+            logger.info("🤖 Calling Gemini API...")
+
+            response = self.model.generate_content(prompt)
+
+            logger.info("🎯 Gemini API responded in %.2fs", time.perf_counter() - api_start)
+            result = self._process_response(response.text, tables_in_schema, start_time)
+            if result.get("confidence", 0) > 0:
+                prompt_cache_put(prompt, result)
+                if query_vector is not None:
+                    _semantic_cache.add(query_vector, fingerprint, result)
+            return result
+
+        except Exception as e:
+            return self._error_result(e)
+
+    async def generate_sql_query_async(self, natural_query: str, schema_info: str, query_type: str = "SELECT") -> Dict[str, Any]:
+        """Async variant of generate_sql_query.
+
+        Uses generate_content_async so callers already running on an event
+        loop (the API handlers, the query pipeline) don't block it for the
+        duration of the LLM round trip, and independent calls can be issued
+        concurrently with asyncio.gather.
+        """
+        start_time = time.perf_counter()
+        logger.info("🚀 Starting SQL query generation for: '%s'", natural_query)
+
+        prompt, tables_in_schema = self._prepare_prompt(natural_query, schema_info, query_type)
+
+        cached = prompt_cache_get(prompt)
+        if cached is not None:
+            logger.info("📦 Prompt cache hit, skipping Gemini call")
+            return cached
+
+        # Near-duplicate phrasings: an embedding round trip is far cheaper
+        # than a generation. The embed call blocks, so it runs on the
+        # threadpool rather than holding the event loop.
+        fingerprint = _schema_fingerprint(schema_info)
+        query_vector = None
+        if not _PROMPT_CACHE_DISABLED:
+            query_vector = await asyncio.to_thread(_semantic_cache.embed, natural_query)
+            if query_vector is not None:
+                cached = _semantic_cache.match(query_vector, fingerprint)
+                if cached is not None:
+                    return cached
+
+        try:
+            api_start = time.perf_counter()
+            logger.info("🤖 Calling Gemini API...")
+
+            response = await self.model.generate_content_async(prompt)
+
+            logger.info("🎯 Gemini API responded in %.2fs", time.perf_counter() - api_start)
+            result = self._process_response(response.text, tables_in_schema, start_time)
+            if result.get("confidence", 0) > 0:
+                prompt_cache_put(prompt, result)
+                if query_vector is not None:
+                    _semantic_cache.add(query_vector, fingerprint, result)
+            return result
+
+        except Exception as e:
+            return self._error_result(e)
+
+    def _retrieve_relevant_tables(
+        self,
+        natural_query: str,
+        schema: Dict[str, List[Dict[str, Any]]],
+        top_k: int = _RETRIEVAL_TOP_K,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Narrow a large schema to the tables most relevant to the query.
+
+        Each table's name+columns line is embedded once (cached until its
+        column set changes, missing tables embedded in one batched call);
+        the query embedding is scored against them and the top_k survive.
+        Falls back to the full schema when embedding fails or no table
+        clears the similarity floor.
+        """
+        query_vector = _semantic_cache.embed(natural_query)
+        if query_vector is None:
+            return schema
+
+        keys = {
+            table_name: (table_name, hash(tuple(
+                (column['column_name'], column['data_type']) for column in columns
+            )))
+            for table_name, columns in schema.items()
+        }
+        missing = [t for t, key in keys.items() if key not in _table_vector_cache]
+        if missing:
+            texts = [
+                f"Table {table_name}: " + ", ".join(
+                    f"{column['column_name']} ({column['data_type']})"
+                    for column in schema[table_name]
+                )
+                for table_name in missing
+            ]
+            try:
+                response = _load_genai().embed_content(
+                    model=SemanticCache.EMBEDDING_MODEL, content=texts
+                )
+                vectors = response["embedding"]
+            except Exception as e:
+                logger.debug("Table embedding failed, sending full schema: %s", e)
+                return schema
+            if vectors and isinstance(vectors[0], float):
+                vectors = [vectors]  # single-content responses come back flat
+            for table_name, vector in zip(missing, vectors):
+                norm = sum(v * v for v in vector) ** 0.5
+                if norm:
+                    _table_vector_cache[keys[table_name]] = [v / norm for v in vector]
+        scores = {
+            table_name: sum(a * b for a, b in zip(query_vector, _table_vector_cache[key]))
+            for table_name, key in keys.items()
+            if key in _table_vector_cache
+        }
+        if not scores or max(scores.values()) < _RETRIEVAL_FLOOR:
+            return schema
+
+        top = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        keep = set(top)
+        logger.info("🎯 Schema retrieval kept %d/%d tables for the prompt", len(keep), len(schema))
+        return {t: schema[t] for t in schema if t in keep}
+
+    def _prepare_prompt(self, natural_query: str, schema_info, query_type: str):
+        """Build the generation prompt and the table list it advertises."""
         # Ensure initialized
         self._ensure_initialized()
-        
+
+        # Narrow big schemas to the query-relevant tables before paying to
+        # format and send them (dict input only; strings are pre-filtered)
+        if (not isinstance(schema_info, str)
+                and len(schema_info) > _RETRIEVAL_MIN_TABLES
+                and not _PROMPT_CACHE_DISABLED):
+            schema_info = self._retrieve_relevant_tables(natural_query, schema_info)
+
         # Format schema for prompt (handle both string and dict inputs)
-        schema_start = time.time()
+        schema_start = time.perf_counter()
         if isinstance(schema_info, str):
             formatted_schema = schema_info
-            # Count tables in string format
-            table_count = len([line for line in schema_info.split('\n') if line.startswith('TABLE:')])
+            # One regex pass instead of two split/startswith scans
+            tables_in_schema = _TABLE_RE.findall(schema_info)
+            table_count = len(tables_in_schema)
         else:
-            formatted_schema = self._format_schema_for_prompt(schema_info)
+            formatted_schema, schema_tables = _format_schema_cached(
+                _schema_cache_key(schema_info)
+            )
+            tables_in_schema = list(schema_tables)
             table_count = len(schema_info)
-        
-        logger.info(f"📋 Schema formatted in {time.time() - schema_start:.2f}s ({table_count} tables)")
-        
-        # Log detailed schema tables being sent to AI
-        tables_in_schema = []
-        for line in formatted_schema.split('\n'):
-            if line.startswith('TABLE:') or line.startswith('Table:'):
-                table_name = line.replace('TABLE:', '').replace('Table:', '').strip()
-                tables_in_schema.append(table_name)
-        
-        logger.info(f"📋 Tables being sent to Gemini AI:")
-        for i, table in enumerate(tables_in_schema, 1):
-            logger.info(f"  {i}. {table}")
-        
+
+        logger.info("📋 Schema formatted in %.2fs (%d tables)", time.perf_counter() - schema_start, table_count)
+
+        # Log detailed schema tables being sent to AI; the enumerate loop
+        # only runs when INFO would actually be emitted
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("📋 Tables being sent to Gemini AI:")
+            for i, table in enumerate(tables_in_schema, 1):
+                logger.info("  %d. %s", i, table)
+
         # Create prompt
-        prompt_start = time.time()
+        prompt_start = time.perf_counter()
         prompt = self._create_sql_generation_prompt(natural_query, formatted_schema, query_type)
-        logger.info(f"📝 Prompt created in {time.time() - prompt_start:.2f}s ({len(prompt)} chars)")
-        
-        # Log a sample of what table info looks like in the prompt
-        logger.debug(f"🔍 Sample schema in prompt (first 500 chars): {formatted_schema[:500]}...")
-        
-        try:
-            # Call Gemini API
-            api_start = time.time()
-            logger.info(f"🤖 Calling Gemini API...")
-            
-            response = self.model.generate_content(prompt)
-            
-            logger.info(f"🎯 Gemini API responded in {time.time() - api_start:.2f}s")
-            
-            # Parse response
-            parse_start = time.time()
-            result = self._parse_gemini_response(response.text)
-            logger.info(f"🔍 Response parsed in {time.time() - parse_start:.2f}s")
-            
-            # Log what tables Gemini actually used in the SQL
-            sql_query = result.get("sql_query", "")
-            used_tables = []
-            for table in tables_in_schema:
-                if table.lower() in sql_query.lower():
-                    used_tables.append(table)
-            
-            logger.info(f"🎯 Tables Gemini chose to use in SQL:")
+        logger.info("📝 Prompt created in %.2fs (%d chars)", time.perf_counter() - prompt_start, len(prompt))
+
+        # Log a sample of what table info looks like in the prompt; guard so
+        # the 500-char slice is never built when DEBUG is off
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 Sample schema in prompt (first 500 chars): %s...", formatted_schema[:500])
+
+        return prompt, tables_in_schema
+
+    def _process_response(self, response_text: str, tables_in_schema: List[str], start_time: float) -> Dict[str, Any]:
+        """Parse the model response and log which tables it used."""
+        # Parse response
+        parse_start = time.perf_counter()
+        result = self._parse_gemini_response(response_text)
+        logger.info("🔍 Response parsed in %.2fs", time.perf_counter() - parse_start)
+
+        # Log what tables Gemini actually used in the SQL. Lowercase the
+        # query once; the old loop re-lowered it per table name.
+        sql_query = result.get("sql_query", "")
+        sql_query_lower = sql_query.lower()
+        used_tables = [
+            table for table in tables_in_schema
+            if table.lower() in sql_query_lower
+        ]
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("🎯 Tables Gemini chose to use in SQL:")
             for i, table in enumerate(used_tables, 1):
-                logger.info(f"  {i}. {table}")
-            
-            if not used_tables:
-                logger.warning(f"⚠️ No recognized tables found in generated SQL!")
-            
-            # Log detailed analysis of table choices
-            if "dl_buyer" in sql_query.lower() and "dl_buyer_address" in sql_query.lower():
-                logger.info(f"🔍 ANALYSIS: Both dl_buyer and dl_buyer_address found in query")
-            elif "dl_buyer_address" in sql_query.lower():
-                logger.info(f"🔍 ANALYSIS: Only dl_buyer_address found in query")
-                logger.info(f"🔍 ANALYSIS: Checking if dl_buyer was in available tables: {'dl_buyer' in [t.lower() for t in tables_in_schema]}")
-            elif "dl_buyer" in sql_query.lower():
-                logger.info(f"🔍 ANALYSIS: Only dl_buyer found in query (this is expected)")
-            
-            logger.info(f"✅ SQL generation completed in {time.time() - start_time:.2f}s total")
-            return result
-                
-        except Exception as e:
-            error_msg = f"Failed to generate SQL: {str(e)}"
-            logger.error(f"❌ {error_msg}")
-            return {
-                "sql_query": "-- Error: Could not generate SQL query",
-                "explanation": error_msg,
-                "confidence": 0.0,
-                "tables_used": []
+                logger.info("  %d. %s", i, table)
+
+        if not used_tables:
+            logger.warning("⚠️ No recognized tables found in generated SQL!")
+
+        logger.info("✅ SQL generation completed in %.2fs total", time.perf_counter() - start_time)
+        return result
+
+    def _error_result(self, exc: Exception) -> Dict[str, Any]:
+        """Uniform error payload for failed generations."""
+        error_msg = f"Failed to generate SQL: {str(exc)}"
+        logger.error("❌ %s", error_msg)
+        return {
+            "sql_query": "-- Error: Could not generate SQL query",
+            "explanation": error_msg,
+            "confidence": 0.0,
+            "tables_used": []
+        }
+
+
+    def generate_sql_batch(self, requests: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Generate SQL for several independent prompts in one dispatch.
+
+        Each request is a dict with "key", "natural_query", "schema_info"
+        and optional "query_type". Prompts are issued concurrently so total
+        latency is one LLM round trip instead of len(requests); results come
+        back keyed by request key. Only use this when the prompts really are
+        independent — improvement chains that build on each other's SQL must
+        stay sequential.
+        """
+        if not requests:
+            return {}
+
+        self._ensure_initialized()
+        results: Dict[str, Dict[str, Any]] = {}
+        max_workers = min(settings.gemini_max_concurrency, len(requests))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.generate_sql_query,
+                    request["natural_query"],
+                    request["schema_info"],
+                    request.get("query_type", "SELECT"),
+                ): request["key"]
+                for request in requests
             }
-    
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
+
     def _format_schema_for_prompt(self, schema: Dict[str, List[Dict[str, Any]]]) -> str:
-        """Format database schema for inclusion in the prompt."""
-        schema_text = "Database Schema:\n"
-        
-        for table_name, columns in schema.items():
-            schema_text += f"\nTable: {table_name}\n"
-            schema_text += "Columns:\n"
-            
-            for column in columns:
-                column_info = f"  - {column['column_name']} ({column['data_type']}"
-                if column['character_maximum_length']:
-                    column_info += f"({column['character_maximum_length']})"
-                column_info += f", nullable: {column['is_nullable']}"
-                if column['column_default']:
-                    column_info += f", default: {column['column_default']}"
-                column_info += ")\n"
-                schema_text += column_info
-        
-        return schema_text
+        """Format database schema for inclusion in the prompt.
+
+        Thin wrapper over the module-level memoized formatter; iteration is
+        sorted (via the cache key) so the serialized schema is byte-stable
+        across calls, keeping the cached prompt prefix identical.
+        """
+        return _format_schema_cached(_schema_cache_key(schema))[0]
     
     def _create_sql_generation_prompt(
         self, 
@@ -150,92 +586,50 @@ class GeminiSQLGenerator:
         schema_context: str, 
         query_type: str
     ) -> str:
-        """Create a comprehensive prompt for SQL generation."""
-        
-        prompt = f"""
-You are an expert SQL query generator. Your task is to convert natural language requests into accurate PostgreSQL queries.
-
-{schema_context}
+        """Create a comprehensive prompt for SQL generation.
 
-User Request: "{user_query}"
-Expected Query Type: {query_type}
-
-Instructions:
-1. Generate a PostgreSQL-compatible SQL query that fulfills the user's request
-2. Use only the tables and columns from the provided schema
-3. Follow PostgreSQL syntax and best practices
-4. Include appropriate WHERE clauses, JOINs, and other necessary SQL constructs
-5. For SELECT queries, choose appropriate columns based on the request
-6. Ensure the query is safe and doesn't include any harmful operations
-
-Please respond with a JSON object containing:
-{{
-    "sql_query": "The generated SQL query",
-    "explanation": "Brief explanation of what the query does",
-    "confidence": 0.95,
-    "tables_used": ["list", "of", "table", "names", "used"]
-}}
-
-Only return the JSON object, no additional text.
-"""
-        
-        return prompt
+        The static instruction/schema prefix is shared across calls; only
+        the user request and query type vary (see _SQL_GENERATION_PROMPT).
+        """
+        return _SQL_GENERATION_PROMPT.format(
+            schema_context=schema_context,
+            user_query=user_query,
+            query_type=query_type,
+        )
     
     def _parse_gemini_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse Gemini's response and extract structured data."""
+        """Parse Gemini's structured JSON response.
+
+        The model runs in JSON response mode (see _ensure_initialized), so
+        the text is bare JSON — no markdown fences to strip and no prose
+        fallback to scan for SQL keywords.
+        """
         try:
-            # Try to extract JSON from the response
-            response_text = response_text.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            elif response_text.startswith("```"):
-                response_text = response_text.replace("```", "").strip()
-            
-            # Parse JSON
-            result = json.loads(response_text)
-            
-            # Validate required fields
-            required_fields = ["sql_query", "explanation", "confidence", "tables_used"]
-            for field in required_fields:
-                if field not in result:
-                    result[field] = "" if field in ["sql_query", "explanation"] else []
-            
-            return result
-            
-        except json.JSONDecodeError as e:
-            logger.warning(f"Failed to parse JSON response: {e}")
-            
-            # Fallback: try to extract SQL query manually
-            lines = response_text.split('\n')
-            sql_query = ""
-            
-            for line in lines:
-                if any(keyword in line.upper() for keyword in ['SELECT', 'INSERT', 'UPDATE', 'DELETE']):
-                    sql_query = line.strip()
-                    break
-            
+            result = _json_loads(response_text)
+        # ValueError covers both json.JSONDecodeError and orjson's
+        except ValueError as e:
+            logger.warning("Failed to parse JSON response: %s", e)
             return {
-                "sql_query": sql_query,
-                "explanation": "Parsed from non-JSON response",
-                "confidence": 0.5,
+                "sql_query": "",
+                "explanation": "Model returned unparseable output",
+                "confidence": 0.0,
                 "tables_used": []
             }
+
+        # Validate required fields
+        required_fields = ["sql_query", "explanation", "confidence", "tables_used"]
+        for field in required_fields:
+            if field not in result:
+                result[field] = "" if field in ["sql_query", "explanation"] else []
+
+        return result
     
     def validate_query_safety(self, sql_query: str) -> bool:
         """Basic validation to ensure query safety."""
-        dangerous_keywords = [
-            'DROP', 'TRUNCATE', 'DELETE FROM', 'ALTER', 'CREATE', 
-            'GRANT', 'REVOKE', '--', ';--', '/*', '*/'
-        ]
-        
-        query_upper = sql_query.upper()
-        for keyword in dangerous_keywords:
-            if keyword in query_upper:
-                logger.warning(f"Potentially dangerous keyword found: {keyword}")
-                return False
-        
+        token = _unsafe_token(sql_query)
+        if token:
+            logger.warning("Potentially dangerous keyword found: %s", token)
+            return False
         return True
 
 # Global Gemini client instance
@@ -3,7 +3,6 @@
 Launch script for the AI SQL Chat Interface
 """
 
-import subprocess
 import sys
 import os
 
@@ -22,13 +21,13 @@ def main():
         print("   source sql-query-env/bin/activate")
         print()
     
+    # Replace this process with Streamlit instead of forking a child and
+    # keeping the launcher alive just to forward signals: Streamlit inherits
+    # the terminal directly and one Python process's memory is saved.
+    cmd = [sys.executable, "-m", "streamlit", "run", "chat_app.py", "--server.port=8501"]
     try:
-        # Launch Streamlit
-        cmd = [sys.executable, "-m", "streamlit", "run", "chat_app.py", "--server.port=8501"]
-        subprocess.run(cmd, check=True)
-    except KeyboardInterrupt:
-        print("\n👋 Chat interface stopped by user")
-    except subprocess.CalledProcessError as e:
+        os.execvp(cmd[0], cmd)
+    except OSError as e:
         print(f"❌ Error launching chat interface: {e}")
         sys.exit(1)
 
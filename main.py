@@ -19,6 +19,14 @@ import asyncio
 import logging
 from typing import Optional
 
+# uvloop speeds up every asyncio path (MCP HTTP, Gemini, the API server)
+# with no code changes; optional since it has no Windows build.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     """Setup logging configuration."""
     logging.basicConfig(
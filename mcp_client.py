@@ -1,12 +1,147 @@
 import asyncio
+import hashlib
+import itertools
 import json
+import tempfile
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 import logging
 import aiohttp
+from yarl import URL
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+
+    def _json_serialize(obj) -> str:
+        """orjson body serialization for aiohttp (expects str, not bytes)."""
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_serialize = json.dumps
+    _json_loads = json.loads
+
+# Schema fetched via MCP is persisted content-addressed in the temp dir,
+# with a pointer file naming the current sha. A restarted process (or one
+# whose MCP server is briefly unreachable) can then reload the schema from
+# disk instead of paying the round trip for the full JSON again.
+_SCHEMA_POINTER = Path(tempfile.gettempdir()) / "mcp_schema_latest.json"
+
+def _persist_schema(schema: Dict[str, Any]) -> None:
+    """Write the schema to a content-addressed file and update the pointer."""
+    try:
+        payload = json.dumps(schema, default=str).encode()
+        sha = hashlib.sha256(payload).hexdigest()
+        path = Path(tempfile.gettempdir()) / f"mcp_schema_{sha[:16]}.json"
+        if not path.exists():
+            path.write_bytes(payload)
+        _SCHEMA_POINTER.write_text(json.dumps({"sha256": sha, "uri": str(path)}))
+    except Exception as e:
+        logger.debug("Failed to persist MCP schema: %s", e)
+
+def _load_persisted_schema() -> Optional[Dict[str, Any]]:
+    """Load the most recently persisted schema, verifying its digest."""
+    try:
+        pointer = json.loads(_SCHEMA_POINTER.read_text())
+        payload = Path(pointer["uri"]).read_bytes()
+        if hashlib.sha256(payload).hexdigest() != pointer["sha256"]:
+            return None
+        return json.loads(payload)
+    except Exception:
+        return None
+
+# Params for the JSON-RPC "initialize" handshake, shared by the single and
+# batched call paths.
+_INIT_PARAMS = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "roots": {
+            "listChanged": True
+        },
+        "sampling": {}
+    },
+    "clientInfo": {
+        "name": "sql-query-generator",
+        "version": "1.0.0"
+    }
+}
+
+# Request payloads built once at import: per-call code copies a template and
+# fills in the id (unique per request, see MCPClient._id_counter) and params
+# instead of re-allocating the nested dict literal each time.
+_HEADERS = {"Content-Type": "application/json"}
+_INIT_TEMPLATE = {"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": _INIT_PARAMS}
+_LIST_RESOURCES_TEMPLATE = {"jsonrpc": "2.0", "id": 0, "method": "resources/list", "params": {}}
+_READ_RESOURCE_TEMPLATE = {"jsonrpc": "2.0", "id": 0, "method": "resources/read", "params": None}
+_TOOL_CALL_TEMPLATE = {"jsonrpc": "2.0", "id": 0, "method": "tools/call", "params": None}
+
+class _MCPSubmissionQueue:
+    """Coalesces concurrent tool calls into batched JSON-RPC POSTs.
+
+    Callers submit (method, params) and await a future; the queue flushes
+    everything pending as one batch_call once it reaches MAX_DEPTH entries
+    or FLUSH_INTERVAL seconds after the first submission, whichever comes
+    first. When several query generators run concurrently this collapses
+    up to MAX_DEPTH round trips into one; a solo call pays at most the
+    flush interval in extra latency.
+    """
+
+    MAX_DEPTH = 16
+    FLUSH_INTERVAL = 0.005  # seconds
+
+    def __init__(self, client: "MCPClient"):
+        self._client = client
+        self._pending: List[tuple] = []  # (method, params, future)
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def submit(self, method: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Enqueue one call and wait for its slot of the batched response."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((method, params, future))
+        if len(self._pending) >= self.MAX_DEPTH:
+            if self._flush_task is not None:
+                self._flush_task.cancel()
+                self._flush_task = None
+            asyncio.ensure_future(self._flush())
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._timed_flush())
+        return await future
+
+    async def _timed_flush(self):
+        try:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+        except asyncio.CancelledError:
+            return
+        self._flush_task = None
+        await self._flush()
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # Only tools/call routes through the queue, so single entries and
+        # fallbacks dispatch via the direct per-method endpoint.
+        if len(batch) == 1:
+            # Solo call within the flush window: use the proven tools/call
+            # endpoint rather than a one-element batch array at the root.
+            _method, params, future = batch[0]
+            result = await self._client._call_tool_direct(params)
+            if not future.done():
+                future.set_result(result)
+            return
+        results = await self._client.batch_call([(m, p) for m, p, _ in batch])
+        if all(result is None for result in results):
+            # A transport-level batch failure (e.g. server without a root
+            # batch endpoint) is indistinguishable from every entry
+            # failing; retry per-endpoint before resolving to Nones.
+            results = [await self._client._call_tool_direct(p) for _, p, _ in batch]
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
 class MCPClient:
     """Client for communicating with MCP (Model Context Protocol) servers."""
     
@@ -14,50 +149,74 @@ class MCPClient:
         self.server_url = settings.mcp_server_url
         self.server_name = settings.mcp_server_name
         self.session: Optional[aiohttp.ClientSession] = None
-    
+        # Unique id per request: the hardcoded per-method ids collide as
+        # soon as calls run concurrently over the shared session.
+        self._id_counter = itertools.count(1)
+        self._submission_queue = _MCPSubmissionQueue(self)
+        # Endpoint URLs parsed once; passing a yarl.URL lets aiohttp skip
+        # re-parsing the f-string built on every POST.
+        base = URL(self.server_url)
+        self._urls = {
+            "init": base / "initialize",
+            "list": base / "resources/list",
+            "read": base / "resources/read",
+            "call": base / "tools/call",
+            "batch": URL(f"{self.server_url}/"),
+        }
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        """Lazily create the long-lived HTTP session.
+
+        One session for the client's lifetime: closing and reopening per
+        call (the old context-manager pattern) forced a fresh TCP+TLS
+        handshake on every JSON-RPC POST instead of reusing keep-alive
+        connections from the pool.
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    keepalive_timeout=75,
+                    enable_cleanup_closed=True,
+                ),
+                json_serialize=_json_serialize,
+            )
+        return self.session
+
+    async def close(self):
+        """Close the HTTP session. Only call on application shutdown."""
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
     async def __aenter__(self):
-        """Async context manager entry."""
-        self.session = aiohttp.ClientSession()
+        """Async context manager entry: ensures the shared session exists."""
+        await self._ensure_session()
         return self
-    
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit."""
-        if self.session:
-            await self.session.close()
-    
+        """Async context manager exit.
+
+        Deliberately leaves the session open — it is shared across calls
+        and closed once via close() on shutdown.
+        """
+
     async def initialize_connection(self) -> bool:
         """Initialize connection with the MCP server."""
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
-            
+            await self._ensure_session()
+
             # Send initialization request
-            init_payload = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {
-                        "roots": {
-                            "listChanged": True
-                        },
-                        "sampling": {}
-                    },
-                    "clientInfo": {
-                        "name": "sql-query-generator",
-                        "version": "1.0.0"
-                    }
-                }
-            }
-            
+            init_payload = _INIT_TEMPLATE.copy()
+            init_payload["id"] = next(self._id_counter)
+
             async with self.session.post(
-                f"{self.server_url}/initialize",
+                self._urls["init"],
                 json=init_payload,
-                headers={"Content-Type": "application/json"}
+                headers=_HEADERS
             ) as response:
                 if response.status == 200:
-                    result = await response.json()
+                    result = await response.json(loads=_json_loads)
                     logger.info(f"MCP server initialized: {result}")
                     return True
                 else:
@@ -71,20 +230,16 @@ class MCPClient:
     async def list_resources(self) -> List[Dict[str, Any]]:
         """List available resources from the MCP server."""
         try:
-            payload = {
-                "jsonrpc": "2.0",
-                "id": 2,
-                "method": "resources/list",
-                "params": {}
-            }
-            
+            payload = _LIST_RESOURCES_TEMPLATE.copy()
+            payload["id"] = next(self._id_counter)
+
             async with self.session.post(
-                f"{self.server_url}/resources/list",
+                self._urls["list"],
                 json=payload,
-                headers={"Content-Type": "application/json"}
+                headers=_HEADERS
             ) as response:
                 if response.status == 200:
-                    result = await response.json()
+                    result = await response.json(loads=_json_loads)
                     return result.get("result", {}).get("resources", [])
                 else:
                     logger.error(f"Failed to list resources: {response.status}")
@@ -97,22 +252,17 @@ class MCPClient:
     async def read_resource(self, uri: str) -> Optional[str]:
         """Read a specific resource from the MCP server."""
         try:
-            payload = {
-                "jsonrpc": "2.0",
-                "id": 3,
-                "method": "resources/read",
-                "params": {
-                    "uri": uri
-                }
-            }
-            
+            payload = _READ_RESOURCE_TEMPLATE.copy()
+            payload["id"] = next(self._id_counter)
+            payload["params"] = {"uri": uri}
+
             async with self.session.post(
-                f"{self.server_url}/resources/read",
+                self._urls["read"],
                 json=payload,
-                headers={"Content-Type": "application/json"}
+                headers=_HEADERS
             ) as response:
                 if response.status == 200:
-                    result = await response.json()
+                    result = await response.json(loads=_json_loads)
                     contents = result.get("result", {}).get("contents", [])
                     if contents:
                         return contents[0].get("text", "")
@@ -125,35 +275,78 @@ class MCPClient:
             logger.error(f"Error reading resource: {e}")
             return None
     
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Call a tool on the MCP server."""
+    async def _call_tool_direct(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """POST one tools/call request to its own endpoint."""
         try:
-            payload = {
-                "jsonrpc": "2.0",
-                "id": 4,
-                "method": "tools/call",
-                "params": {
-                    "name": tool_name,
-                    "arguments": arguments
-                }
-            }
-            
-            async with self.session.post(
-                f"{self.server_url}/tools/call",
+            session = await self._ensure_session()
+            payload = _TOOL_CALL_TEMPLATE.copy()
+            payload["id"] = next(self._id_counter)
+            payload["params"] = params
+
+            async with session.post(
+                self._urls["call"],
                 json=payload,
-                headers={"Content-Type": "application/json"}
+                headers=_HEADERS
             ) as response:
                 if response.status == 200:
-                    result = await response.json()
+                    result = await response.json(loads=_json_loads)
                     return result.get("result", {})
                 else:
                     logger.error(f"Failed to call tool: {response.status}")
                     return None
-                    
+
+        except Exception as e:
+            logger.error(f"Error calling tool: {e}")
+            return None
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Call a tool on the MCP server.
+
+        Routed through the submission queue: a call that stays alone for
+        the flush window goes out on the direct tools/call endpoint, while
+        genuinely concurrent calls are coalesced into one batched POST.
+        A failed call yields None.
+        """
+        try:
+            return await self._submission_queue.submit(
+                "tools/call", {"name": tool_name, "arguments": arguments}
+            )
         except Exception as e:
             logger.error(f"Error calling tool: {e}")
             return None
     
+    async def batch_call(self, calls: List[tuple]) -> List[Optional[Dict[str, Any]]]:
+        """Send several JSON-RPC requests in one HTTP body.
+
+        JSON-RPC 2.0 batching: calls is a list of (method, params) pairs
+        posted as a single array, so N round trips collapse into one.
+        Results come back positionally (matched by id); a failed entry or
+        transport error yields None in its slot.
+        """
+        try:
+            session = await self._ensure_session()
+            payload = [
+                {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                for i, (method, params) in enumerate(calls)
+            ]
+
+            async with session.post(
+                self._urls["batch"],
+                json=payload,
+                headers=_HEADERS
+            ) as response:
+                if response.status != 200:
+                    logger.error(f"Batch call failed: {response.status}")
+                    return [None] * len(calls)
+                results = await response.json(loads=_json_loads)
+
+            by_id = {entry.get("id"): entry.get("result") for entry in results}
+            return [by_id.get(i) for i in range(len(calls))]
+
+        except Exception as e:
+            logger.error(f"Error in batch call: {e}")
+            return [None] * len(calls)
+
     async def get_database_schema_via_mcp(self) -> Optional[Dict[str, Any]]:
         """Get database schema information via MCP server."""
         try:
@@ -181,28 +374,82 @@ class MCPManager:
     def __init__(self):
         self.client = MCPClient()
         self._initialized = False
-    
+        self._schema_prefetch: Optional[Dict[str, Any]] = None
+
+    async def startup(self) -> bool:
+        """Open the shared HTTP session and initialize the MCP connection."""
+        await self.client._ensure_session()
+        return await self.ensure_initialized()
+
+    async def shutdown(self):
+        """Close the shared HTTP session on application exit."""
+        await self.client.close()
+        self._initialized = False
+
+    async def warmup(self):
+        """Best-effort background warmup of the session and handshake.
+
+        Meant for asyncio.create_task at app startup: the TCP+TLS setup
+        and initialize round trip happen before the first real query
+        instead of inside it. Failures are logged and deferred to the
+        first call's own error handling.
+        """
+        try:
+            await self.startup()
+        except Exception as e:
+            logger.debug("MCP warmup failed: %s", e)
+
     async def ensure_initialized(self) -> bool:
-        """Ensure MCP client is initialized."""
+        """Ensure MCP client is initialized (idempotent).
+
+        First initialization fuses the handshake, resource listing and a
+        schema prefetch into one batched POST — one round trip where the
+        serial version paid three.
+        """
         if not self._initialized:
-            async with self.client:
-                success = await self.client.initialize_connection()
-                self._initialized = success
-                return success
-        return True
-    
+            init_result, _resources, schema = await self.client.batch_call([
+                ("initialize", _INIT_PARAMS),
+                ("resources/list", {}),
+                ("tools/call", {"name": "get_schema", "arguments": {}}),
+            ])
+            if init_result is not None:
+                self._initialized = True
+                logger.info(f"MCP server initialized: {init_result}")
+                self._schema_prefetch = schema
+            else:
+                # The fused handshake assumes the server accepts JSON-RPC
+                # batch arrays at the root, which not every server does.
+                # Retry over the per-method endpoints before declaring MCP
+                # unavailable; the schema prefetch is simply skipped.
+                logger.warning("Batched MCP initialization failed; retrying per-endpoint")
+                self._initialized = await self.client.initialize_connection()
+        return self._initialized
+
     async def get_schema(self) -> Optional[Dict[str, Any]]:
-        """Get database schema via MCP."""
+        """Get database schema via MCP.
+
+        Successful fetches are persisted to disk; when the server is
+        unreachable the last persisted copy (digest-verified) is served
+        instead of failing the request outright.
+        """
+        schema = None
         if await self.ensure_initialized():
-            async with self.client:
-                return await self.client.get_database_schema_via_mcp()
-        return None
-    
+            if self._schema_prefetch is not None:
+                schema, self._schema_prefetch = self._schema_prefetch, None
+            else:
+                schema = await self.client.get_database_schema_via_mcp()
+        if schema:
+            _persist_schema(schema)
+            return schema
+        schema = _load_persisted_schema()
+        if schema:
+            logger.warning("MCP unavailable; serving schema persisted from a previous fetch")
+        return schema
+
     async def execute_query(self, query: str) -> Optional[List[Dict[str, Any]]]:
         """Execute query via MCP."""
         if await self.ensure_initialized():
-            async with self.client:
-                return await self.client.execute_query_via_mcp(query)
+            return await self.client.execute_query_via_mcp(query)
         return None
 
 # Global MCP manager instance
@@ -1,7 +1,15 @@
 import asyncio
+import hashlib
+import json
 import logging
+import re
+import tempfile
+import time
+from functools import lru_cache
+from pathlib import Path
+from time import perf_counter
 from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 import sqlparse
 
@@ -12,15 +20,85 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Schema cache shared by every generator instance: the direct, MCP and
+# dry-run singletons each used to hold their own copy and repeat the fetch.
+# Keyed by (user query, mode) since smart retrieval filters tables per
+# query; the lock stops concurrent cold-cache requests from stampeding the
+# database with identical fetches.
+# The cache survives process restarts (Streamlit hot reloads in
+# particular) via a JSON file on /dev/shm — memory-backed, so reloading
+# it costs microseconds — falling back to the temp dir where /dev/shm
+# doesn't exist. Wall-clock timestamps keep the TTL meaningful across
+# restarts; stale entries just miss as usual.
+_SCHEMA_CACHE_FILE = (
+    Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+) / "sql_gen_schema_cache.json"
+
+def _load_persisted_schema_cache() -> Dict[str, tuple]:
+    """Rehydrate the schema cache written by a previous process, if any."""
+    try:
+        raw = json.loads(_SCHEMA_CACHE_FILE.read_text())
+        return {key: (timestamp, schema) for key, (timestamp, schema) in raw.items()}
+    except Exception:
+        return {}
+
+def _persist_schema_cache():
+    """Best-effort write-through of the schema cache to shared memory."""
+    try:
+        _SCHEMA_CACHE_FILE.write_text(json.dumps(_SCHEMA_CACHE, default=str))
+    except Exception as e:
+        logger.debug("Failed to persist schema cache: %s", e)
+
+_SCHEMA_CACHE: Dict[str, tuple] = _load_persisted_schema_cache()
+_SCHEMA_LOCK = asyncio.Lock()
+_SCHEMA_STATS = {"hits": 0, "misses": 0}
+
+def _schema_cache_key(user_query: str, mode: "QueryExecutionMode") -> str:
+    return hashlib.blake2b(user_query.encode(), digest_size=8).hexdigest() + mode.value
+
+def _warm_gemini_client():
+    """Initialize the Gemini client, deferring any failure to generation.
+
+    Runs concurrently with schema retrieval; a missing API key or auth
+    problem is surfaced by the generation call itself, with its existing
+    error handling, rather than aborting the pipeline here.
+    """
+    try:
+        gemini_client._ensure_initialized()
+    except Exception:
+        pass
+
+@lru_cache(maxsize=1024)
+def _format_sql_cached(sql_query: str) -> str:
+    """sqlparse.format memoized on the raw SQL.
+
+    sqlparse is pure Python and by far the slowest local step; cached
+    prompts and repeated questions re-format identical SQL constantly.
+    """
+    try:
+        return sqlparse.format(
+            sql_query,
+            reindent=True,
+            keyword_case='upper',
+            identifier_case='lower'
+        )
+    except Exception:
+        return sql_query
+
 class QueryExecutionMode(Enum):
     """Execution modes for queries."""
     DIRECT = "direct"  # Execute directly via psycopg2
     MCP = "mcp"       # Execute via MCP server
     DRY_RUN = "dry_run"  # Just generate, don't execute
 
-@dataclass
+@dataclass(slots=True)
 class QueryResult:
-    """Result of a query generation and execution."""
+    """Result of a query generation and execution.
+
+    slots=True drops the per-instance __dict__; batch workloads create one
+    of these per query, so the smaller layout and faster attribute access
+    add up.
+    """
     success: bool
     sql_query: str
     explanation: str
@@ -29,7 +107,7 @@ class QueryResult:
     execution_time: Optional[float] = None
     row_count: Optional[int] = None
     confidence: float = 0.0
-    tables_used: List[str] = None
+    tables_used: List[str] = field(default_factory=list)
 
 class SQLQueryGenerator:
     """Main class for generating and executing SQL queries."""
@@ -40,35 +118,41 @@ class SQLQueryGenerator:
         self._schema_cache_timestamp = 0
     
     async def generate_and_execute_query(
-        self, 
-        user_input: str, 
+        self,
+        user_input: str,
         query_type: str = "SELECT",
-        execute: bool = True
+        execute: bool = True,
+        row_limit: Optional[int] = None
     ) -> QueryResult:
         """
         Generate SQL query from natural language and optionally execute it.
-        
+
         Args:
             user_input: Natural language description of the query
             query_type: Type of SQL query (SELECT, INSERT, UPDATE, DELETE)
             execute: Whether to execute the generated query
-            
+            row_limit: Cap appended as LIMIT n to SELECT queries lacking one
+
         Returns:
             QueryResult containing the generated query and execution results
         """
-        import time
-        start_time = time.time()
-        logger.info(f"🔥 Starting query generation pipeline for: '{user_input}'")
-        
+        start_time = perf_counter()
+        logger.info("🔥 Starting query generation pipeline for: '%s'", user_input)
+
         try:
-            # Get database schema
-            schema_start = time.time()
+            # Get database schema, warming the Gemini client (model build,
+            # TLS session) in parallel — generation needs both, and neither
+            # depends on the other.
+            schema_start = perf_counter()
             logger.info("📊 Retrieving database schema...")
-            schema = await self._get_database_schema(user_input)
-            schema_time = time.time() - schema_start
-            
+            schema, _ = await asyncio.gather(
+                self._get_database_schema(user_input),
+                asyncio.to_thread(_warm_gemini_client),
+            )
+            schema_time = perf_counter() - schema_start
+
             if not schema:
-                logger.error(f"❌ Schema retrieval failed after {schema_time:.2f}s")
+                logger.error("❌ Schema retrieval failed after %.2fs", schema_time)
                 return QueryResult(
                     success=False,
                     sql_query="",
@@ -76,19 +160,22 @@ class SQLQueryGenerator:
                     error="Schema retrieval failed"
                 )
             
-            logger.info(f"📋 Schema retrieved in {schema_time:.2f}s ({len(schema)} tables)")
-            
+            table_count = (schema.count("CREATE TABLE ")
+                           if isinstance(schema, str) else len(schema))
+            logger.info("📋 Schema retrieved in %.2fs (%d tables)", schema_time, table_count)
+
             # Generate SQL query using Gemini
-            gemini_start = time.time()
+            gemini_start = perf_counter()
             logger.info("🤖 Calling Gemini for SQL generation...")
-            query_info = gemini_client.generate_sql_query(
+            # Async variant: the LLM round trip no longer blocks the event
+            # loop, so concurrent API requests make progress during it.
+            query_info = await gemini_client.generate_sql_query_async(
                 user_input, schema, query_type
             )
-            gemini_time = time.time() - gemini_start
-            logger.info(f"🎯 Gemini completed in {gemini_time:.2f}s")
-            
+            logger.info("🎯 Gemini completed in %.2fs", perf_counter() - gemini_start)
+
             if "error" in query_info:
-                logger.error(f"❌ Gemini generation failed: {query_info['error']}")
+                logger.error("❌ Gemini generation failed: %s", query_info["error"])
                 return QueryResult(
                     success=False,
                     sql_query="",
@@ -99,21 +186,26 @@ class SQLQueryGenerator:
             sql_query = query_info["sql_query"]
             
             # Validate query safety
-            safety_start = time.time()
+            safety_start = perf_counter()
             if not gemini_client.validate_query_safety(sql_query):
-                logger.warning(f"🛡️ Query failed safety validation after {time.time() - safety_start:.2f}s")
+                logger.warning("🛡️ Query failed safety validation after %.2fs", perf_counter() - safety_start)
                 return QueryResult(
                     success=False,
                     sql_query=sql_query,
                     explanation="Query failed safety validation",
                     error="Potentially unsafe query detected"
                 )
-            logger.info(f"🛡️ Query safety validated in {time.time() - safety_start:.2f}s")
-            
+            logger.info("🛡️ Query safety validated in %.2fs", perf_counter() - safety_start)
+
             # Format the SQL query
-            format_start = time.time()
+            format_start = perf_counter()
             formatted_query = self._format_sql_query(sql_query)
-            logger.info(f"✨ Query formatted in {time.time() - format_start:.2f}s")
+            logger.info("✨ Query formatted in %.2fs", perf_counter() - format_start)
+
+            # Cap unbounded SELECTs before execution if the caller asked for it
+            if (row_limit and query_type.upper() == "SELECT"
+                    and not re.search(r'\bLIMIT\b', formatted_query, re.IGNORECASE)):
+                formatted_query = f"{formatted_query.rstrip().rstrip(';')}\nLIMIT {row_limit}"
             
             result = QueryResult(
                 success=True,
@@ -125,11 +217,10 @@ class SQLQueryGenerator:
             
             # Execute query if requested and not in dry run mode
             if execute and self.execution_mode != QueryExecutionMode.DRY_RUN:
-                exec_start = time.time()
-                logger.info(f"🚀 Executing query in {self.execution_mode.value} mode...")
+                exec_start = perf_counter()
+                logger.info("🚀 Executing query in %s mode...", self.execution_mode.value)
                 execution_result = await self._execute_query(formatted_query, query_type)
-                exec_time = time.time() - exec_start
-                logger.info(f"⚡ Query executed in {exec_time:.2f}s")
+                logger.info("⚡ Query executed in %.2fs", perf_counter() - exec_start)
                 
                 result.data = execution_result.get("data")
                 result.execution_time = execution_result.get("execution_time")
@@ -139,13 +230,11 @@ class SQLQueryGenerator:
                     result.error = execution_result["error"]
                     result.success = False
             
-            total_time = time.time() - start_time
-            logger.info(f"🎉 Complete pipeline finished in {total_time:.2f}s")
+            logger.info("🎉 Complete pipeline finished in %.2fs", perf_counter() - start_time)
             return result
-            
+
         except Exception as e:
-            total_time = time.time() - start_time
-            logger.error(f"❌ Pipeline error after {total_time:.2f}s: {e}")
+            logger.error("❌ Pipeline error after %.2fs: %s", perf_counter() - start_time, e)
             return QueryResult(
                 success=False,
                 sql_query="",
@@ -153,59 +242,87 @@ class SQLQueryGenerator:
                 error=str(e)
             )
     
-    async def _get_database_schema(self, user_query: str = "") -> Optional[Dict[str, Any]]:
+    async def _get_database_schema(self, user_query: str = "") -> Optional[Union[Dict[str, Any], str]]:
         """Get database schema with caching and smart filtering."""
-        import time
+        # Wall clock (not perf_counter) on purpose: cache timestamps are
+        # TTLs that must stay meaningful across process restarts.
         current_time = time.time()
-        
-        # Use cached schema if it's less than configured timeout
+
+        # Shared cache first (all generator instances, keyed per query/mode)
         cache_timeout = settings.schema_cache_timeout
-        if (self._schema_cache and 
-            current_time - self._schema_cache_timestamp < cache_timeout):
-            logger.info(f"📋 Using cached schema (less than {cache_timeout/60:.1f} minutes old)")
-            return self._schema_cache
-        
+        cache_key = _schema_cache_key(user_query, self.execution_mode)
+        cached = _SCHEMA_CACHE.get(cache_key)
+        if cached and current_time - cached[0] < cache_timeout:
+            _SCHEMA_STATS["hits"] += 1
+            logger.info("📋 Using cached schema (less than %.1f minutes old)", cache_timeout / 60)
+            return cached[1]
+
+        async with _SCHEMA_LOCK:
+            # Re-check: a concurrent request may have filled the cache while
+            # this one waited on the lock.
+            cached = _SCHEMA_CACHE.get(cache_key)
+            if cached and time.time() - cached[0] < cache_timeout:
+                _SCHEMA_STATS["hits"] += 1
+                logger.info("📋 Using schema cached by a concurrent request")
+                return cached[1]
+            _SCHEMA_STATS["misses"] += 1
+            return await self._fetch_database_schema(user_query, cache_key)
+
+    async def _fetch_database_schema(self, user_query: str, cache_key: str) -> Optional[Union[Dict[str, Any], str]]:
+        """Fetch the schema from MCP or the database and cache it."""
+        current_time = time.time()
+
         try:
             if self.execution_mode == QueryExecutionMode.MCP:
                 # Try to get schema via MCP first
-                mcp_start = time.time()
+                mcp_start = perf_counter()
                 logger.info("🔗 Attempting schema retrieval via MCP...")
                 schema = await mcp_manager.get_schema()
                 if schema:
-                    mcp_time = time.time() - mcp_start
-                    logger.info(f"🔗 MCP schema retrieved in {mcp_time:.2f}s")
+                    logger.info("🔗 MCP schema retrieved in %.2fs", perf_counter() - mcp_start)
+                    _SCHEMA_CACHE[cache_key] = (current_time, schema)
+                    _persist_schema_cache()
                     self._schema_cache = schema
                     self._schema_cache_timestamp = current_time
                     return schema
                 else:
-                    logger.warning(f"⚠️ MCP schema retrieval failed after {time.time() - mcp_start:.2f}s")
-            
-            # Fallback to direct database connection
-            db_start = time.time()
+                    logger.warning("⚠️ MCP schema retrieval failed after %.2fs", perf_counter() - mcp_start)
+
+            # Fallback to direct database connection. Both psycopg2 calls
+            # (and the Gemini table selection inside smart retrieval) block,
+            # so they run on the default threadpool — the loop keeps serving
+            # other requests even while _SCHEMA_LOCK is held.
+            db_start = perf_counter()
             logger.info("🗄️ Testing database connection...")
-            if db_manager.test_connection():
-                logger.info(f"✅ Database connection successful in {time.time() - db_start:.2f}s")
-                
-                schema_start = time.time()
-                logger.info(f"🧠 Using smart schema retrieval for query: '{user_query}'")
-                schema = db_manager.get_smart_database_schema(
-                    user_query=user_query, 
-                    table_prefix="dl_", 
+            if await asyncio.to_thread(db_manager.test_connection):
+                logger.info("✅ Database connection successful in %.2fs", perf_counter() - db_start)
+
+                schema_start = perf_counter()
+                logger.info("🧠 Using smart schema retrieval for query: '%s'", user_query)
+                # DDL string, not the nested dict: relevance filtering has
+                # already run, so the prompt gets the compact pre-filtered
+                # text verbatim instead of re-filtering and re-formatting it.
+                schema = await asyncio.to_thread(
+                    db_manager.get_smart_database_ddl,
+                    user_query=user_query,
+                    table_prefix="dl_",
                     max_tables=20
                 )
-                schema_time = time.time() - schema_start
-                logger.info(f"📋 Smart schema retrieved: {len(schema)} tables in {schema_time:.2f}s")
-                
+                logger.info("📋 Smart schema DDL retrieved: %d tables in %.2fs",
+                            schema.count("CREATE TABLE "), perf_counter() - schema_start)
+
+                _SCHEMA_CACHE[cache_key] = (current_time, schema)
+                _persist_schema_cache()
                 self._schema_cache = schema
                 self._schema_cache_timestamp = current_time
                 return schema
             else:
-                logger.error(f"❌ Database connection failed after {time.time() - db_start:.2f}s")
-            
+                logger.error("❌ Database connection failed after %.2fs", perf_counter() - db_start)
+
             return None
-            
+
         except Exception as e:
-            logger.error(f"❌ Error getting database schema: {e}")
+            logger.error("❌ Error getting database schema: %s", e)
             return None
     
     async def _execute_query(
@@ -214,16 +331,14 @@ class SQLQueryGenerator:
         query_type: str
     ) -> Dict[str, Any]:
         """Execute SQL query based on the execution mode."""
-        import time
-        
-        start_time = time.time()
-        
+        start_time = perf_counter()
+
         try:
             if self.execution_mode == QueryExecutionMode.MCP:
                 # Execute via MCP server
                 data = await mcp_manager.execute_query(sql_query)
-                execution_time = time.time() - start_time
-                
+                execution_time = perf_counter() - start_time
+
                 return {
                     "data": data,
                     "execution_time": execution_time,
@@ -231,11 +346,12 @@ class SQLQueryGenerator:
                 }
             
             elif self.execution_mode == QueryExecutionMode.DIRECT:
-                # Execute directly via psycopg2
+                # Execute directly via psycopg2, off the event loop — the
+                # DB round trip is the longest blocking call in the pipeline
                 if query_type.upper() == "SELECT":
-                    data = db_manager.execute_query(sql_query)
-                    execution_time = time.time() - start_time
-                    
+                    data = await asyncio.to_thread(db_manager.execute_query, sql_query)
+                    execution_time = perf_counter() - start_time
+
                     return {
                         "data": data,
                         "execution_time": execution_time,
@@ -243,9 +359,9 @@ class SQLQueryGenerator:
                     }
                 else:
                     # For non-SELECT queries
-                    row_count = db_manager.execute_non_query(sql_query)
-                    execution_time = time.time() - start_time
-                    
+                    row_count = await asyncio.to_thread(db_manager.execute_non_query, sql_query)
+                    execution_time = perf_counter() - start_time
+
                     return {
                         "data": None,
                         "execution_time": execution_time,
@@ -255,8 +371,8 @@ class SQLQueryGenerator:
             return {"error": "Invalid execution mode"}
             
         except Exception as e:
-            execution_time = time.time() - start_time
-            logger.error(f"Query execution error: {e}")
+            execution_time = perf_counter() - start_time
+            logger.error("Query execution error: %s", e)
             return {
                 "error": str(e),
                 "execution_time": execution_time
@@ -264,15 +380,7 @@ class SQLQueryGenerator:
     
     def _format_sql_query(self, sql_query: str) -> str:
         """Format SQL query for better readability."""
-        try:
-            return sqlparse.format(
-                sql_query, 
-                reindent=True, 
-                keyword_case='upper',
-                identifier_case='lower'
-            )
-        except:
-            return sql_query
+        return _format_sql_cached(sql_query)
     
     def set_execution_mode(self, mode: QueryExecutionMode):
         """Set the execution mode for queries."""
@@ -280,7 +388,12 @@ class SQLQueryGenerator:
         logger.info(f"Execution mode set to: {mode.value}")
     
     def clear_schema_cache(self):
-        """Clear the cached database schema."""
+        """Clear the cached database schema (shared, persisted and per-instance)."""
+        _SCHEMA_CACHE.clear()
+        try:
+            _SCHEMA_CACHE_FILE.unlink()
+        except OSError:
+            pass
         self._schema_cache = None
         self._schema_cache_timestamp = 0
         logger.info("Schema cache cleared")